@@ -1,70 +1,222 @@
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from . import models, schemas
 from .database import get_db
+from .utils.reporting import reporting_index
+from .utils.revocation import revocation_list
 
 # Secret key and algorithm
-# In production, store this in environment variables
-SECRET_KEY = "THIS_IS_A_SECURE_SECRET_KEY_FOR_DEVELOPMENT_ONLY"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Extended for better user experience
+# Outside development, SECRET_KEY (or JWT_SIGNING_KEYS) must be set: the app refuses to start otherwise
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+DEVELOPMENT_SECRET_KEY = "THIS_IS_A_SECURE_SECRET_KEY_FOR_DEVELOPMENT_ONLY"
+SECRET_KEY = os.getenv("SECRET_KEY", DEVELOPMENT_SECRET_KEY)
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+# Access tokens are short-lived; clients renew them with the refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Signing keys as "kid:secret" pairs, comma-separated. The first one signs new
+# tokens; the others are still accepted, so keys can be rotated without
+# logging everyone out. Defaults to SECRET_KEY under the kid "default".
+# Tokens without a kid (issued before rotation existed) are only accepted
+# while a key with the kid "legacy" is listed; removing it retires them.
+JWT_SIGNING_KEYS = os.getenv("JWT_SIGNING_KEYS", "")
+LEGACY_KID = "legacy"
+# How long a user's row is reused across requests before it is read again
+AUTH_USER_CACHE_SECONDS = float(os.getenv("AUTH_USER_CACHE_SECONDS", "30"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+# bcrypt cost for stored passwords (passlib's default)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+ACCESS = "access"
+REFRESH = "refresh"
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Password hashing. passlib and the bcrypt backend are slow to import, so the
+# context is built on first use instead of at startup.
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    # Hashes with fewer rounds (bulk-imported initial passwords) are upgraded on the next login
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__min_rounds=BCRYPT_ROUNDS)
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def authenticate_user(db: Session, email: str, password: str):
     user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user:
+        return False
+    verified, new_hash = get_pwd_context().verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
+@lru_cache(maxsize=None)
+def signing_keys():
+    """(kid used for new tokens, {kid: secret}), parsed once"""
+    keys = {}
+    for entry in JWT_SIGNING_KEYS.split(","):
+        kid, _, secret = entry.strip().partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    if not [kid for kid in keys if kid != LEGACY_KID]:
+        keys["default"] = SECRET_KEY
+    # The legacy key only verifies old tokens; new ones are signed with the first other key
+    return next(kid for kid in keys if kid != LEGACY_KID), keys
+
+def check_signing_keys():
+    """Refuse to run outside development with the secret that ships in the repository"""
+    if ENVIRONMENT == "development":
+        return
+    placeholders = {DEVELOPMENT_SECRET_KEY, "your_secret_key_here_change_in_production"}
+    if any(secret in placeholders for secret in signing_keys()[1].values()):
+        raise RuntimeError(
+            f"ENVIRONMENT={ENVIRONMENT} but no real signing secret is configured; set SECRET_KEY or JWT_SIGNING_KEYS"
+        )
+
+check_signing_keys()
+
+def _encode(claims: dict, expires_delta: timedelta):
+    from jose import jwt
+    kid, keys = signing_keys()
+    now = time.time()
+    claims = {
+        **claims,
+        "jti": uuid.uuid4().hex,
+        "iat": now,  # fractional, so a revocation can't catch tokens issued right after it
+        "nbf": int(now),
+        "exp": int(now + expires_delta.total_seconds()),
+    }
+    return jwt.encode(claims, keys[kid], algorithm=ALGORITHM, headers={"kid": kid})
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({
-        "exp": expire,
-        "iat": datetime.utcnow(),  # Issued at time
-        "nbf": datetime.utcnow()   # Not valid before time
-    })
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return _encode({**data, "type": ACCESS}, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_refresh_token(data: dict):
+    return _encode({**data, "type": REFRESH}, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+def create_tokens(user: models.User) -> dict:
+    """Access and refresh token pair for a login or a refresh"""
+    claims = {"sub": user.email, "uid": user.id, "role": user.role, "org": user.organization_id}
+    return {
+        "access_token": create_access_token(claims),
+        "refresh_token": create_refresh_token(claims),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+@lru_cache(maxsize=AUTH_TOKEN_CACHE_SIZE)
+def _verified_claims(token: str) -> dict:
+    # Signature checks are cached per token; expiry is checked on every use in decode_token
+    from jose import JWTError, jwt
+    kid = jwt.get_unverified_header(token).get("kid")
+    # Tokens from before key rotation have no kid; they verify against the legacy key while it is listed
+    secret = signing_keys()[1].get(kid or LEGACY_KID)
+    if secret is None:
+        raise JWTError("Unknown signing key")
+    return jwt.decode(token, secret, algorithms=[ALGORITHM])
+
+def decode_token(token: str, token_type: str = ACCESS) -> dict:
+    """Verified claims of ``token``; raises jose's JWTError if it is invalid, expired or of another type"""
+    from jose import JWTError
+    claims = _verified_claims(token)
+    if claims.get("exp", 0) <= time.time():
+        raise JWTError("Signature has expired")
+    # Tokens from before refresh tokens existed carry no type and are access tokens
+    if claims.get("type", ACCESS) != token_type:
+        raise JWTError("Wrong token type")
+    return claims
+
+def token_expiry(claims: dict) -> datetime:
+    return datetime.utcfromtimestamp(claims["exp"])
+
+def is_revoked(db: Session, claims: dict, user_id: int) -> bool:
+    return revocation_list.is_revoked(db, claims.get("jti"), user_id, float(claims.get("iat", 0)))
+
+def revoke_token(db: Session, claims: dict):
+    if claims.get("jti"):
+        revocation_list.revoke_token(db, claims["jti"], token_expiry(claims))
+
+def revoke_user_tokens(db: Session, user: models.User):
+    """Log the user out everywhere, e.g. on deactivation or a password change"""
+    revocation_list.revoke_user(db, user.id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    forget_user(user.email)
+
+# User columns by email, so authenticated requests don't query the users table.
+# The password hash is left out; it is loaded from the database if accessed.
+USER_CACHE_COLUMNS = ("id", "organization_id", "email", "full_name", "role", "is_active", "is_admin", "manager_id")
+_user_cache = {}  # email -> (columns, loaded_at)
+
+def forget_user(email: str):
+    _user_cache.pop(email, None)
+
+def _cached_user(db: Session, email: str) -> Optional[models.User]:
+    entry = _user_cache.get(email)
+    if entry is None or time.monotonic() - entry[1] >= AUTH_USER_CACHE_SECONDS:
+        row = db.query(*[getattr(models.User, column) for column in USER_CACHE_COLUMNS]).filter(
+            models.User.email == email
+        ).first()
+        if row is None:
+            forget_user(email)
+            return None
+        if len(_user_cache) > 10000:
+            _user_cache.clear()
+        entry = (dict(zip(USER_CACHE_COLUMNS, row)), time.monotonic())
+        _user_cache[email] = entry
+    # Attach as a persistent instance without loading it: relationships and the
+    # deferred password hash still load on access, and changes are saved on commit
+    user = db.identity_map.get(db.identity_key(models.User, entry[0]["id"]))
+    if user is None:
+        user = models.User(**entry[0])
+        make_transient_to_detached(user)
+        db.add(user)
+    return user
+
+def authenticate_token(db: Session, token: str) -> models.User:
+    """The user a bearer access token belongs to, or 401"""
+    from jose import JWTError
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    user = _cached_user(db, token_data.email)
     if user is None:
         raise credentials_exception
+    # The token's organization decides which tenant database get_db opened; it must be the user's
+    if payload.get("org") != user.organization_id:
+        raise credentials_exception
+    if is_revoked(db, payload, user.id):
+        raise credentials_exception
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return authenticate_token(db, token)
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -78,14 +230,32 @@ def get_current_manager(current_user: models.User = Depends(get_current_active_u
         )
     return current_user
 
+def get_current_admin(current_user: models.User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized. Admin access required."
+        )
+    return current_user
+
+def same_organization(model, user: models.User):
+    """Filter criterion restricting ``model`` rows to ``user``'s organization"""
+    # Comparing with None renders IS NULL, which matches rows from before organizations existed
+    return model.organization_id == user.organization_id
+
+def verify_same_organization(user: models.User, other: Optional[models.User]):
+    """404 unless ``other`` exists and belongs to ``user``'s organization"""
+    if other is None or other.organization_id != user.organization_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return other
+
 def verify_user_is_manager_of_employee(manager: models.User, employee_id: int, db: Session):
-    # Check if employee exists and is managed by current manager
-    employee = db.query(models.User).filter(
-        models.User.id == employee_id, 
-        models.User.manager_id == manager.id
-    ).first()
+    # Check if employee is managed by current manager (in memory via the reporting-line index)
+    employee = None
+    if reporting_index.is_report(db, manager.id, employee_id):
+        employee = db.get(models.User, employee_id)
     
-    if not employee:
+    if not employee or employee.organization_id != manager.organization_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Employee with ID {employee_id} not found or not managed by you"
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Request
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,17 +15,277 @@ load_dotenv()
 # Use environment variable for DB URL or default to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./feedback_app.db")
 
+# Optional comma-separated list of read replicas, e.g.
+# DATABASE_REPLICA_URLS=postgresql://user:pw@replica1/db,postgresql://user:pw@replica2/db
+# For local testing two SQLite files work too (copy the primary file to the replica path).
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# How long a client keeps reading from the primary after one of its own writes
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# Optional database-per-tenant mode (SQLite only): each organization's feedback, requests,
+# comments, tags and notifications live in TENANT_DATABASE_DIR/organization_<id>.db
+TENANT_DATABASE_DIR = os.getenv("TENANT_DATABASE_DIR")
+if TENANT_DATABASE_DIR and not DATABASE_URL.startswith("sqlite"):
+    raise RuntimeError("TENANT_DATABASE_DIR requires a SQLite DATABASE_URL")
+
+# Tables that stay in the main database in tenant mode
+SHARED_TABLES = ("organizations", "users", "idempotency_records", "revoked_tokens")
+
+def _create_engine(url: str):
+    return create_engine(
+        url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {}
+    )
+
 # Create engine for connecting to DB
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = _create_engine(DATABASE_URL)
+replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+
+# Tenant mode: organization id -> engine for that organization's file
+tenant_engines = {}
+_tenant_engines_lock = threading.Lock()
+
+def _attach_shared_database(dbapi_connection, connection_record):
+    # Unqualified users/organizations resolve to the main database, so joins keep working
+    dbapi_connection.execute("ATTACH DATABASE ? AS shared", (engine.url.database,))
+
+def tenant_engine(organization_id: int):
+    """Engine for one organization's SQLite file, created with its tables on first use"""
+    with _tenant_engines_lock:
+        tenant = tenant_engines.get(organization_id)
+        if tenant is None:
+            os.makedirs(TENANT_DATABASE_DIR, exist_ok=True)
+            path = os.path.join(TENANT_DATABASE_DIR, f"organization_{int(organization_id)}.db")
+            tenant = _create_engine(f"sqlite:///{path}")
+            event.listen(tenant, "connect", _attach_shared_database)
+            init_schema(bind=tenant, tables=tenant_tables())
+            tenant_engines[organization_id] = tenant
+    return tenant
+
+def tenant_tables():
+    return [table for name, table in Base.metadata.tables.items() if name not in SHARED_TABLES]
+
+def _pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    # Only QueuePool has a size/overflow; SingletonThreadPool and NullPool report just the class
+    if hasattr(pool, "checkedout"):
+        size = pool.size()
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        stats.update({
+            "size": size,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Negative until more than ``size`` connections have been opened
+            "overflow": pool.overflow(),
+            "max_overflow": max_overflow,
+            "capacity": size + max_overflow if max_overflow >= 0 else None,
+        })
+    return stats
+
+def pool_stats() -> dict:
+    """Connection pool usage of every engine in this process, for readiness checks and autoscaling"""
+    tenants = [_pool_stats(tenant) for tenant in list(tenant_engines.values())]
+    return {
+        "primary": _pool_stats(engine),
+        "replicas": [_pool_stats(replica) for replica in replica_engines],
+        "tenants": {
+            "engines": len(tenants),
+            "checked_out": sum(stats.get("checked_out", 0) for stats in tenants),
+        },
+    }
+
+class RoutingSession(Session):
+    """Session that routes to a tenant database or a read replica.
+
+    With TENANT_DATABASE_DIR set, a session whose ``info["organization_id"]``
+    is set (``get_db`` does this from the bearer token) uses that
+    organization's engine for everything. Otherwise writes (flushes) always
+    go to the primary engine, and a session only uses a replica when
+    ``info["use_replica"]`` is set, which ``get_db`` does for safe (GET/HEAD)
+    requests from clients that have not written recently (the client sends
+    back the X-Last-Write header or last_write cookie of its last write).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        organization_id = self.info.get("organization_id")
+        if TENANT_DATABASE_DIR and organization_id is not None:
+            return tenant_engine(organization_id)
+        if self.info.get("use_replica") and replica_engines and not self._flushing:
+            # Stay on one replica for the whole session so reads are consistent
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(replica_engines)
+            return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def tenant_organization_ids() -> list:
+    """Organizations that have a database file in TENANT_DATABASE_DIR (none outside tenant mode)"""
+    if not TENANT_DATABASE_DIR or not os.path.isdir(TENANT_DATABASE_DIR):
+        return []
+    organization_ids = []
+    for name in os.listdir(TENANT_DATABASE_DIR):
+        prefix, _, rest = name.partition("_")
+        if prefix == "organization" and rest.endswith(".db") and rest[:-len(".db")].isdigit():
+            organization_ids.append(int(rest[:-len(".db")]))
+    return sorted(organization_ids)
+
+def maintenance_sessions():
+    """
+    Yield (label, session) for every database holding feedback data: the
+    main database and, in tenant mode, each organization's file. For the
+    maintenance scripts, which would otherwise only see the main database.
+    Each session is closed when the loop moves on.
+    """
+    databases = [("main database", None)] + [
+        (f"organization {organization_id}", organization_id) for organization_id in tenant_organization_ids()
+    ]
+    for label, organization_id in databases:
+        db = SessionLocal()
+        if organization_id is not None:
+            db.info["organization_id"] = organization_id
+        try:
+            yield label, db
+        finally:
+            db.close()
+
+def init_schema(bind=None, tables=None):
+    """Create missing tables, and add missing columns and indexes to existing ones.
+
+    There is no migration tool, so additive changes are applied here: new
+    tables are created, new nullable columns are added with ALTER TABLE and
+    new indexes are created. Anything else (dropped or changed columns) has
+    to be done by hand. An index can carry a statement to run first in
+    ``info["before_create"]`` (e.g. removing duplicates before a unique
+    index). An index that still can't be created is reported and skipped;
+    it never stops the application from starting.
+    """
+    from sqlalchemy import inspect
+    bind = bind if bind is not None else engine
+    tables = tables if tables is not None else list(Base.metadata.tables.values())
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    missing = [table for table in tables if table.name not in existing_tables]
+    if missing:
+        Base.metadata.create_all(bind=bind, tables=missing)
+
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as connection:
+        for table in tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable:
+                    print(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                    continue
+                print(f"Adding column {table.name}.{column.name}")
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                    f"{preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}"
+                )
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    print(f"Creating index {index.name}")
+                    savepoint = connection.begin_nested()
+                    try:
+                        if index.info.get("before_create"):
+                            connection.exec_driver_sql(index.info["before_create"])
+                        index.create(bind=connection)
+                        savepoint.commit()
+                    except DBAPIError as exc:
+                        savepoint.rollback()
+                        print(f"Could not create index {index.name}, skipping it: {exc.orig}")
+
+# Read-your-writes is carried by the client, so it holds whichever worker or host
+# serves the next request: responses to requests that wrote anything carry the write
+# time in LAST_WRITE_HEADER and a LAST_WRITE_COOKIE. get_db reads from the primary
+# while the value sent back is less than REPLICA_STICKY_SECONDS old, and per-process
+# caches (utils/cache.py) ignore results computed before it. A client can only make
+# its own requests skip the replica or the cache by sending a newer value.
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "last_write"
+# The cookie holds a time that readers judge themselves; it only has to outlive the caches
+LAST_WRITE_COOKIE_SECONDS = 3600
+
+def last_write_time(request: Request) -> float:
+    """When the client says it last wrote (epoch seconds), 0 if it didn't say"""
+    for value in (request.headers.get(LAST_WRITE_HEADER), request.cookies.get(LAST_WRITE_COOKIE)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+def has_recent_write(request: Request) -> bool:
+    return time.time() - last_write_time(request) < REPLICA_STICKY_SECONDS
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_pending_write(session, flush_context):
+    session.info["has_writes"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_committed_write(session):
+    scope = session.info.get("scope")
+    if session.info.pop("has_writes", False) and scope is not None:
+        # Read by ReadYourWritesMiddleware when the response starts
+        scope["last_write"] = time.time()
+
+class ReadYourWritesMiddleware:
+    """Tell the client when its request last committed a write (see get_db and utils/cache.py)"""
+
+    def __init__(self, app, cookie_seconds: int = LAST_WRITE_COOKIE_SECONDS):
+        self.app = app
+        self.cookie_seconds = cookie_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_last_write(message):
+            if message["type"] == "http.response.start" and scope.get("last_write"):
+                value = f"{scope['last_write']:.3f}"
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.lower().encode("latin-1"), value.encode("latin-1")))
+                headers.append((b"set-cookie", (
+                    f"{LAST_WRITE_COOKIE}={value}; Max-Age={self.cookie_seconds}; Path=/; SameSite=Lax"
+                ).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_last_write)
+
+def _token_organization(request: Request):
+    """Organization claim of a valid bearer token (None if absent/invalid)"""
+    from jose import JWTError
+    from . import auth
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return auth.decode_token(token).get("org")
+    except JWTError:
+        return None
+
 # Dependency
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["scope"] = request.scope
+    if TENANT_DATABASE_DIR:
+        # get_current_user checks that the claim matches the user's organization
+        db.info["organization_id"] = _token_organization(request)
+    if replica_engines and request.method in ("GET", "HEAD") and not has_recent_write(request):
+        db.info["use_replica"] = True
     try:
         yield db
     finally:
@@ -1,6 +1,8 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Enum
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Float, ForeignKey, Integer, LargeBinary, String, DateTime, Text, Enum, Index, UniqueConstraint
+)
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func, text
 import enum
 
 from .database import Base
@@ -14,15 +16,34 @@ class FeedbackSentiment(str, enum.Enum):
     NEUTRAL = "neutral"
     NEGATIVE = "negative"
 
+class FeedbackRequestStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+
+class Organization(Base):
+    """A tenant: one company hosted on this deployment"""
+    __tablename__ = "organizations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_organization_manager", "organization_id", "manager_id"),
+        Index("ix_users_organization_role", "organization_id", "role"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     email = Column(String, unique=True, index=True)
     full_name = Column(String)
     hashed_password = Column(String)
     role = Column(Enum(UserRole))
     is_active = Column(Boolean, default=True)
+    # Operator access (request profiling); set with scripts/grant_admin.py, never through the API
+    is_admin = Column(Boolean, default=False)
 
     # Manager can have many employees
     manager_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -35,11 +56,22 @@ class User(Base):
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        # Per-party listings newest first (lists, dashboards, timeline)
+        Index("ix_feedback_manager_id_created_at", "manager_id", "created_at"),
+        Index("ix_feedback_employee_id_created_at", "employee_id", "created_at"),
+        # The same listings scoped to a tenant
+        Index("ix_feedback_organization_manager_created", "organization_id", "manager_id", "created_at"),
+        Index("ix_feedback_organization_employee_created", "organization_id", "employee_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    content = Column(Text)
-    strengths = Column(Text)
-    areas_to_improve = Column(Text)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
+    # Unbounded text bodies are deferred as one group so list queries don't load them;
+    # detail views load them with undefer_group("body")
+    content = deferred(Column(Text), group="body")
+    strengths = deferred(Column(Text), group="body")
+    areas_to_improve = deferred(Column(Text), group="body")
     sentiment = Column(Enum(FeedbackSentiment))
     is_anonymous = Column(Boolean, default=False)
     
@@ -52,6 +84,11 @@ class Feedback(Base):
     is_acknowledged = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Thread activity kept up to date by create_feedback_comment, so lists need no COUNT per row
+    # (nullable so init_schema can add them; scripts/backfill_comment_counts.py fills existing rows)
+    comment_count = Column(Integer, default=0, nullable=True)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
     
     # Optional: link to a feedback request
     feedback_request_id = Column(Integer, ForeignKey("feedback_requests.id"), nullable=True)
@@ -68,10 +105,32 @@ class Feedback(Base):
 
 class FeedbackRequest(Base):
     __tablename__ = "feedback_requests"
+    __table_args__ = (
+        # Serves the pending queue: status filter, per employee, oldest first
+        Index("ix_feedback_requests_status_employee_created", "status", "employee_id", "created_at"),
+        Index("ix_feedback_requests_employee_id_created_at", "employee_id", "created_at"),
+        Index("ix_feedback_requests_organization_status_created", "organization_id", "status", "created_at"),
+        Index("ix_feedback_requests_organization_employee_created", "organization_id", "employee_id", "created_at"),
+        # At most one pending request per employee. Databases from before the queue may hold
+        # several; init_schema keeps each employee's oldest and completes the rest first
+        Index(
+            "uq_feedback_requests_pending_employee", "employee_id", unique=True,
+            sqlite_where=text("status = 'pending'"), postgresql_where=text("status = 'pending'"),
+            info={"before_create": (
+                "UPDATE feedback_requests SET status = 'completed' WHERE status = 'pending' AND id NOT IN "
+                "(SELECT MIN(id) FROM feedback_requests WHERE status = 'pending' GROUP BY employee_id)"
+            )},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     employee_id = Column(Integer, ForeignKey("users.id"))
-    status = Column(String, default="pending")  # pending, completed
+    # Stored as the enum values ("pending"/"completed") to match existing rows
+    status = Column(
+        Enum(FeedbackRequestStatus, values_callable=lambda statuses: [status.value for status in statuses]),
+        default=FeedbackRequestStatus.PENDING,
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -80,19 +139,29 @@ class FeedbackRequest(Base):
 
 class FeedbackComment(Base):
     __tablename__ = "feedback_comments"
+    __table_args__ = (
+        Index("ix_feedback_comments_feedback_id_created_at", "feedback_id", "created_at"),
+        Index("ix_feedback_comments_organization_feedback_created", "organization_id", "feedback_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     feedback_id = Column(Integer, ForeignKey("feedback.id"))
+    # Author; null for comments written before it was recorded
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     comment = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship
     feedback = relationship("Feedback", back_populates="comments")
+    author = relationship("User")
 
 class FeedbackTag(Base):
     __tablename__ = "feedback_tags"
+    __table_args__ = (Index("ix_feedback_tags_organization_tag_name", "organization_id", "tag_name"),)
 
     id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     feedback_id = Column(Integer, ForeignKey("feedback.id"))
     tag_name = Column(String)
     
@@ -101,8 +170,14 @@ class FeedbackTag(Base):
     
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_organization_user_created", "organization_id", "user_id", "created_at"),
+        # Archiving keeps feedback that a notification still points to; without this it scans notifications per row
+        Index("ix_notifications_related_feedback_id", "related_feedback_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     message = Column(String)
     read = Column(Boolean, default=False)
@@ -112,3 +187,120 @@ class Notification(Base):
     
     # Relationships
     user = relationship("User", backref="notifications")
+
+class ChangeEvent(Base):
+    """Transactional outbox: one row per feedback, comment, tag or request change.
+
+    Rows are written in the same transaction as the change they describe and
+    read by the change feed. ``id`` is the monotonic sequence number clients
+    sync from; ``manager_id``/``employee_id`` are the parties who may see it.
+    """
+    __tablename__ = "change_events"
+    __table_args__ = (
+        Index("ix_change_events_manager_id_id", "manager_id", "id"),
+        Index("ix_change_events_employee_id_id", "employee_id", "id"),
+        # Never reuse ids on SQLite, so the sequence stays monotonic
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String)  # feedback, comment, tag, feedback_request
+    entity_id = Column(Integer)
+    operation = Column(String)  # created, updated, acknowledged, completed
+    manager_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    employee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    payload = Column(Text)  # JSON snapshot of the entity after the change
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IdempotencyRecord(Base):
+    """Stored result of a POST made with an Idempotency-Key header.
+
+    A row is inserted (with ``status_code`` unset) before the request runs, so
+    concurrent retries across workers see it as in progress; it is completed
+    with the response once the handler finishes.
+    """
+    __tablename__ = "idempotency_records"
+    __table_args__ = (UniqueConstraint("user_key", "key", name="uq_idempotency_user_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_key = Column(String)  # token subject the key is scoped to
+    key = Column(String)
+    method_path = Column(String)
+    request_hash = Column(String)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class ReminderLog(Base):
+    """When a user was last sent each kind of reminder, for throttling"""
+    __tablename__ = "reminder_log"
+    __table_args__ = (UniqueConstraint("user_id", "kind", name="uq_reminder_log_user_kind"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    kind = Column(String)  # stale_requests, unacknowledged_feedback
+    last_sent_at = Column(DateTime)
+
+class FeedbackSignature(Base):
+    """MinHash signature of a feedback's text (content, strengths, areas to improve).
+
+    Maintained with the feedback on create/update; see app/utils/similarity.py.
+    """
+    __tablename__ = "feedback_signatures"
+
+    feedback_id = Column(Integer, ForeignKey("feedback.id"), primary_key=True)
+    manager_id = Column(Integer, ForeignKey("users.id"), index=True)
+    signature = Column(LargeBinary)  # NUM_PERMUTATIONS little-endian uint32 values
+
+class FeedbackLshBucket(Base):
+    """One row per (feedback, LSH band): feedback sharing a bucket are near-duplicate candidates"""
+    __tablename__ = "feedback_lsh_buckets"
+    __table_args__ = (
+        Index("ix_feedback_lsh_buckets_manager_band_bucket", "manager_id", "band", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    feedback_id = Column(Integer, ForeignKey("feedback.id"), index=True)
+    manager_id = Column(Integer, ForeignKey("users.id"))
+    band = Column(Integer)
+    bucket = Column(BigInteger)
+
+class ArchiveSegment(Base):
+    """A compressed block of archived rows: NDJSON, one object per archived row"""
+    __tablename__ = "archive_segments"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String)  # feedback, notification
+    codec = Column(String)  # zstd, zlib
+    row_count = Column(Integer)
+    min_id = Column(Integer)
+    max_id = Column(Integer)
+    data = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ArchivedFeedback(Base):
+    """Where an archived feedback lives, with the columns needed to find it by party"""
+    __tablename__ = "archived_feedback"
+    __table_args__ = (
+        Index("ix_archived_feedback_manager_created", "manager_id", "created_at"),
+        Index("ix_archived_feedback_employee_created", "employee_id", "created_at"),
+    )
+
+    feedback_id = Column(Integer, primary_key=True)
+    segment_id = Column(Integer, ForeignKey("archive_segments.id"), index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
+    manager_id = Column(Integer, ForeignKey("users.id"))
+    employee_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True))
+
+class RevokedToken(Base):
+    """A revoked access/refresh token (``jti:<id>``) or all of a user's tokens up to a moment (``user:<id>``)"""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)  # sync cursor for the in-memory revocation filters
+    key = Column(String, index=True)
+    # user entries: tokens issued (iat, epoch seconds) before this are revoked
+    revoked_before = Column(Float, nullable=True)
+    expires_at = Column(DateTime, index=True)  # the entry can be purged after this
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
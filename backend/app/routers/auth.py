@@ -1,4 +1,5 @@
-from datetime import timedelta
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -20,8 +21,52 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email, "role": user.role}, expires_delta=access_token_expires
+    return auth.create_tokens(user)
+
+@router.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """
+    New access and refresh tokens for a valid refresh token. Refresh tokens
+    are single use: the one presented is revoked.
+    """
+    from jose import JWTError
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        claims = auth.decode_token(body.refresh_token, auth.REFRESH)
+    except JWTError:
+        raise credentials_exception
+    # Unlike access tokens, refreshes always read the user, so deactivation applies at once
+    user = db.query(models.User).filter(models.User.email == claims.get("sub")).first()
+    if not user or not user.is_active or claims.get("org") != user.organization_id or \
+       auth.is_revoked(db, claims, user.id):
+        raise credentials_exception
+    auth.revoke_token(db, claims)
+    return auth.create_tokens(user)
+
+@router.post("/token/revoke")
+async def revoke_tokens(
+    body: Optional[schemas.LogoutRequest] = None,
+    everywhere: bool = False,
+    token: str = Depends(auth.oauth2_scheme),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Log out: revoke the access token used for this request and the given refresh token,
+    or every token of the user with ``everywhere=true``"""
+    from jose import JWTError
+    if everywhere:
+        auth.revoke_user_tokens(db, current_user)
+        return {"status": "success"}
+    auth.revoke_token(db, auth.decode_token(token))
+    if body and body.refresh_token:
+        try:
+            claims = auth.decode_token(body.refresh_token, auth.REFRESH)
+        except JWTError:
+            claims = None
+        if claims and claims.get("sub") == current_user.email:
+            auth.revoke_token(db, claims)
+    return {"status": "success"}
@@ -1,85 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Dict, List
 import json
 
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import get_db, last_write_time
+from ..utils import cache, serialization
 
 router = APIRouter()
 
+def _compute_manager_dashboard(db: Session, manager_id: int, view: schemas.FeedbackView):
+    # Get count of employees - with error handling
+    try:
+        employees_count = db.query(models.User).filter(
+            models.User.manager_id == manager_id
+        ).count()
+        print(f"Found {employees_count} employees")
+    except Exception as e:
+        print(f"Error counting employees: {str(e)}")
+        employees_count = 0
+
+    # Get count of feedback given - with error handling
+    try:
+        feedback_count = db.query(models.Feedback).filter(
+            models.Feedback.manager_id == manager_id
+        ).count()
+        print(f"Found {feedback_count} feedback items")
+    except Exception as e:
+        print(f"Error counting feedback: {str(e)}")
+        feedback_count = 0
+
+    # Initialize sentiment dict with defaults
+    feedback_by_sentiment = {
+        "positive": 0,
+        "neutral": 0,
+        "negative": 0
+    }
+
+    # Get sentiment distribution - with error handling
+    try:
+        sentiment_counts = db.query(
+            models.Feedback.sentiment,
+            func.count(models.Feedback.id)
+        ).filter(
+            models.Feedback.manager_id == manager_id
+        ).group_by(models.Feedback.sentiment).all()
+
+        print(f"Sentiment counts: {sentiment_counts}")
+
+        for sentiment, count in sentiment_counts:
+            if sentiment and sentiment.value in feedback_by_sentiment:
+                feedback_by_sentiment[sentiment.value] = count
+
+    except Exception as e:
+        print(f"Error getting sentiment counts: {str(e)}")
+
+    # Get recent feedback - with error handling
+    try:
+        rows = db.query(*serialization.feedback_list_columns(view)).filter(
+            models.Feedback.manager_id == manager_id
+        ).order_by(
+            models.Feedback.created_at.desc()
+        ).limit(5).all()
+        recent_feedback = serialization.feedback_list_payload(db, rows, view)
+        print(f"Found {len(recent_feedback)} recent feedback items")
+    except Exception as e:
+        print(f"Error getting recent feedback: {str(e)}")
+        recent_feedback = []
+
+    return {
+        "feedback_count": feedback_count,
+        "employees_count": employees_count,
+        "feedback_by_sentiment": feedback_by_sentiment,
+        "recent_feedback": recent_feedback
+    }
+
 @router.get("/dashboard/manager", response_model=schemas.ManagerDashboard)
 def get_manager_dashboard(
+    request: Request,
+    view: schemas.FeedbackView = schemas.FeedbackView.FULL,
     current_user: models.User = Depends(auth.get_current_manager),
     db: Session = Depends(get_db)
 ):
     try:
         print(f"Manager {current_user.id} requesting dashboard")
         
-        # Get count of employees - with error handling
-        try:
-            employees_count = db.query(models.User).filter(
-                models.User.manager_id == current_user.id
-            ).count()
-            print(f"Found {employees_count} employees")
-        except Exception as e:
-            print(f"Error counting employees: {str(e)}")
-            employees_count = 0
-        
-        # Get count of feedback given - with error handling
-        try:
-            feedback_count = db.query(models.Feedback).filter(
-                models.Feedback.manager_id == current_user.id
-            ).count()
-            print(f"Found {feedback_count} feedback items")
-        except Exception as e:
-            print(f"Error counting feedback: {str(e)}")
-            feedback_count = 0
-        
-        # Initialize sentiment dict with defaults
-        feedback_by_sentiment = {
-            "positive": 0,
-            "neutral": 0,
-            "negative": 0
-        }
-        
-        # Get sentiment distribution - with error handling
-        try:
-            sentiment_counts = db.query(
-                models.Feedback.sentiment,
-                func.count(models.Feedback.id)
-            ).filter(
-                models.Feedback.manager_id == current_user.id
-            ).group_by(models.Feedback.sentiment).all()
-            
-            print(f"Sentiment counts: {sentiment_counts}")
-            
-            for sentiment, count in sentiment_counts:
-                if sentiment and sentiment.value in feedback_by_sentiment:
-                    feedback_by_sentiment[sentiment.value] = count
-                
-        except Exception as e:
-            print(f"Error getting sentiment counts: {str(e)}")
-        
-        # Get recent feedback - with error handling
-        try:
-            recent_feedback = db.query(models.Feedback).filter(
-                models.Feedback.manager_id == current_user.id
-            ).order_by(
-                models.Feedback.created_at.desc()
-            ).limit(5).all()
-            print(f"Found {len(recent_feedback)} recent feedback items")
-        except Exception as e:
-            print(f"Error getting recent feedback: {str(e)}")
-            recent_feedback = []
-        
-        return {
-            "feedback_count": feedback_count,
-            "employees_count": employees_count,
-            "feedback_by_sentiment": feedback_by_sentiment,
-            "recent_feedback": recent_feedback
-        }
+        # Concurrent requests share one computation; a recent result is served while it refreshes
+        user_id = current_user.id
+        result = cache.dashboard_cache.get_or_compute(
+            user_id,
+            ("manager", user_id, view),
+            lambda session: _compute_manager_dashboard(session, user_id, view),
+            db,
+            # Invalidation is per worker: skip results older than this client's last write
+            not_before=last_write_time(request),
+        )
+        return ORJSONResponse(result)
     except Exception as e:
         print(f"ERROR in get_manager_dashboard: {str(e)}")
         import traceback
@@ -91,16 +109,66 @@ def get_manager_dashboard(
             "feedback_by_sentiment": {"positive": 0, "neutral": 0, "negative": 0},
             "recent_feedback": []
         }
-    
+
+def _compute_employee_dashboard(db: Session, employee_id: int, view: schemas.FeedbackView):
+    # Get count of feedback received - with error handling
+    try:
+        feedback_count = db.query(models.Feedback).filter(
+            models.Feedback.employee_id == employee_id
+        ).count()
+        print(f"Found {feedback_count} feedback items")
+    except Exception as e:
+        print(f"Error counting feedback: {str(e)}")
+        feedback_count = 0
+
+    # Initialize sentiment dict with defaults
+    feedback_by_sentiment = {
+        "positive": 0,
+        "neutral": 0,
+        "negative": 0
+    }
+
+    # Get sentiment distribution - with error handling
+    try:
+        sentiment_counts = db.query(
+            models.Feedback.sentiment,
+            func.count(models.Feedback.id)
+        ).filter(
+            models.Feedback.employee_id == employee_id
+        ).group_by(models.Feedback.sentiment).all()
+
+        print(f"Sentiment counts: {sentiment_counts}")
+
+        for sentiment, count in sentiment_counts:
+            if sentiment and sentiment.value in feedback_by_sentiment:
+                feedback_by_sentiment[sentiment.value] = count
+
+    except Exception as e:
+        print(f"Error getting sentiment counts: {str(e)}")
+
+    # Get recent feedback - with error handling
+    try:
+        rows = db.query(*serialization.feedback_list_columns(view)).filter(
+            models.Feedback.employee_id == employee_id
+        ).order_by(
+            models.Feedback.created_at.desc()
+        ).limit(5).all()
+        recent_feedback = serialization.feedback_list_payload(db, rows, view)
+        print(f"Found {len(recent_feedback)} recent feedback items")
+    except Exception as e:
+        print(f"Error getting recent feedback: {str(e)}")
+        recent_feedback = []
+
     return {
         "feedback_count": feedback_count,
-        "employees_count": employees_count,
         "feedback_by_sentiment": feedback_by_sentiment,
         "recent_feedback": recent_feedback
     }
 
 @router.get("/dashboard/employee", response_model=schemas.EmployeeDashboard)
 def get_employee_dashboard(
+    request: Request,
+    view: schemas.FeedbackView = schemas.FeedbackView.FULL,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -116,58 +184,17 @@ def get_employee_dashboard(
                 "recent_feedback": []
             }
         
-        # Get count of feedback received - with error handling
-        try:
-            feedback_count = db.query(models.Feedback).filter(
-                models.Feedback.employee_id == current_user.id
-            ).count()
-            print(f"Found {feedback_count} feedback items")
-        except Exception as e:
-            print(f"Error counting feedback: {str(e)}")
-            feedback_count = 0
-        
-        # Initialize sentiment dict with defaults
-        feedback_by_sentiment = {
-            "positive": 0,
-            "neutral": 0,
-            "negative": 0
-        }
-        
-        # Get sentiment distribution - with error handling
-        try:
-            sentiment_counts = db.query(
-                models.Feedback.sentiment,
-                func.count(models.Feedback.id)
-            ).filter(
-                models.Feedback.employee_id == current_user.id
-            ).group_by(models.Feedback.sentiment).all()
-            
-            print(f"Sentiment counts: {sentiment_counts}")
-            
-            for sentiment, count in sentiment_counts:
-                if sentiment and sentiment.value in feedback_by_sentiment:
-                    feedback_by_sentiment[sentiment.value] = count
-                
-        except Exception as e:
-            print(f"Error getting sentiment counts: {str(e)}")
-        
-        # Get recent feedback - with error handling
-        try:
-            recent_feedback = db.query(models.Feedback).filter(
-                models.Feedback.employee_id == current_user.id
-            ).order_by(
-                models.Feedback.created_at.desc()
-            ).limit(5).all()
-            print(f"Found {len(recent_feedback)} recent feedback items")
-        except Exception as e:
-            print(f"Error getting recent feedback: {str(e)}")
-            recent_feedback = []
-        
-        return {
-            "feedback_count": feedback_count,
-            "feedback_by_sentiment": feedback_by_sentiment,
-            "recent_feedback": recent_feedback
-        }
+        # Concurrent requests share one computation; a recent result is served while it refreshes
+        user_id = current_user.id
+        result = cache.dashboard_cache.get_or_compute(
+            user_id,
+            ("employee", user_id, view),
+            lambda session: _compute_employee_dashboard(session, user_id, view),
+            db,
+            # Invalidation is per worker: skip results older than this client's last write
+            not_before=last_write_time(request),
+        )
+        return ORJSONResponse(result)
     except Exception as e:
         print(f"ERROR in get_employee_dashboard: {str(e)}")
         import traceback
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, undefer_group
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
 
+import orjson
+
 from .. import models, schemas, auth
-from ..database import get_db
-from ..utils import notifications
+from ..database import SessionLocal, get_db
+from ..utils import archive, cache, notifications, outbox, serialization
+from ..utils.params import field_selector, parse_ids
+from ..utils.reporting import reporting_index
 
 router = APIRouter()
 
+def index_similarity(db: Session, feedback: models.Feedback):
+    # The similarity index needs NumPy; it is imported on the first write rather than at start-up
+    from ..utils import similarity
+
+    similarity.index_feedback(db, feedback)
+
 @router.post("/feedback/", response_model=schemas.Feedback)
 def create_feedback(
     feedback: schemas.FeedbackCreate,
@@ -33,13 +45,10 @@ def create_feedback(
         if current_user.role == models.UserRole.MANAGER:
             print("User is a manager, proceeding with manager flow")
             # Verify employee belongs to this manager
-            employee = db.query(models.User).filter(
-                models.User.id == feedback.employee_id,
-                models.User.manager_id == current_user.id
-            ).first()
+            is_report = reporting_index.is_report(db, current_user.id, feedback.employee_id)
             
-            print(f"Employee lookup result: {employee}")
-            if not employee:
+            print(f"Employee lookup result: {is_report}")
+            if not is_report:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"Employee with ID {feedback.employee_id} not managed by you"
@@ -48,7 +57,8 @@ def create_feedback(
             # For managers, create normal downward feedback
             db_feedback = models.Feedback(
                 **feedback_dict,
-                manager_id=current_user.id
+                manager_id=current_user.id,
+                organization_id=current_user.organization_id
             )
             print(f"Created manager feedback object: {db_feedback.__dict__}")
             
@@ -65,7 +75,8 @@ def create_feedback(
             db_feedback = models.Feedback(
                 **feedback_dict,
                 manager_id=current_user.id,  # Employee is providing feedback
-                employee_id=current_user.manager_id  # Manager is receiving feedback
+                employee_id=current_user.manager_id,  # Manager is receiving feedback
+                organization_id=current_user.organization_id
             )
             print(f"Created employee feedback object: {db_feedback.__dict__}")
     except Exception as e:
@@ -87,24 +98,33 @@ def create_feedback(
                 detail="Feedback request not found or not for this employee"
             )
         
-        request.status = "completed"
+        request.status = models.FeedbackRequestStatus.COMPLETED
       # Add feedback to database
     try:
         # Add feedback to database
         print("Adding feedback to database")
         db.add(db_feedback)
+        outbox.record_change(db, "feedback", db_feedback, "created", db_feedback.manager_id, db_feedback.employee_id)
+        index_similarity(db, db_feedback)
+        if feedback.feedback_request_id:
+            outbox.record_change(db, "feedback_request", request, "completed", db_feedback.manager_id, request.employee_id)
         print("Committing transaction")
         db.commit()
         print("Refreshing feedback object")
         db.refresh(db_feedback)
         print(f"Feedback created with ID: {db_feedback.id}")
+        cache.dashboard_cache.invalidate_user(db_feedback.manager_id, db_feedback.employee_id)
+        reporting_index.record_feedback(db_feedback.manager_id, db_feedback.employee_id)
         
         # Add tags if provided
         if tags:
             print(f"Adding tags: {tags}")
             for tag_name in tags:
-                tag = models.FeedbackTag(feedback_id=db_feedback.id, tag_name=tag_name)
+                tag = models.FeedbackTag(
+                    feedback_id=db_feedback.id, tag_name=tag_name, organization_id=db_feedback.organization_id
+                )
                 db.add(tag)
+                outbox.record_change(db, "tag", tag, "created", db_feedback.manager_id, db_feedback.employee_id)
             db.commit()
             print("Tags added successfully")
         
@@ -122,10 +142,12 @@ def create_feedback(
         db.rollback()  # Roll back transaction on error
         raise HTTPException(status_code=500, detail=f"Server error in database operations: {str(e)}")
 
-@router.get("/feedback/", response_model=List[schemas.Feedback])
+@router.get("/feedback/", response_model=List[Union[schemas.Feedback, schemas.FeedbackSummary]])
 def read_feedback(
     skip: int = 0, 
     limit: int = 100,
+    view: schemas.FeedbackView = schemas.FeedbackView.FULL,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.FEEDBACK_SELECTABLE_FIELDS)),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -133,44 +155,178 @@ def read_feedback(
         if current_user.role == models.UserRole.MANAGER:
             print(f"Manager {current_user.id} requesting feedback list")
             # Managers see feedback they've given
-            feedback = db.query(models.Feedback).filter(
+            rows = db.query(*serialization.feedback_list_columns(view, fields)).filter(
+                auth.same_organization(models.Feedback, current_user),
                 models.Feedback.manager_id == current_user.id
             ).offset(skip).limit(limit).all()
         else:
             print(f"Employee {current_user.id} requesting feedback list")
             # Employees see feedback they've received
-            feedback = db.query(models.Feedback).filter(
+            rows = db.query(*serialization.feedback_list_columns(view, fields)).filter(
+                auth.same_organization(models.Feedback, current_user),
                 models.Feedback.employee_id == current_user.id
             ).offset(skip).limit(limit).all()
         
-        print(f"Found {len(feedback)} feedback items")
-        return feedback
+        print(f"Found {len(rows)} feedback items")
+        # Serialise the column tuples directly instead of validating ORM objects
+        return ORJSONResponse(serialization.feedback_list_payload(db, rows, view, fields))
     except Exception as e:
         print(f"ERROR in read_feedback: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@router.get("/feedback/batch", response_model=List[schemas.Feedback])
+def read_feedback_batch(
+    feedback_ids: List[int] = Depends(parse_ids),
+    fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.FEEDBACK_SELECTABLE_FIELDS)),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Fetch several feedback items at once, applying the same rules as read_feedback_by_id.
+    Ids that don't exist or aren't visible to the current user are left out."""
+    query = db.query(*serialization.feedback_list_columns(fields=fields)).filter(
+        auth.same_organization(models.Feedback, current_user),
+        models.Feedback.id.in_(feedback_ids)
+    )
+    if current_user.role == models.UserRole.EMPLOYEE:
+        query = query.filter(models.Feedback.employee_id == current_user.id)
+    else:
+        query = query.filter(models.Feedback.manager_id == current_user.id)
+    
+    return ORJSONResponse(serialization.feedback_list_payload(db, query.all(), fields=fields))
+
+@router.post("/feedback/sentiment-suggestion", response_model=schemas.SentimentSuggestion)
+def suggest_sentiment(
+    draft: schemas.SentimentSuggestionRequest,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Suggested sentiment for a feedback draft, computed locally by the lexicon model"""
+    # Imported on first use: the model needs NumPy, which would add to every worker's start-up
+    from ..utils import sentiment
+
+    suggested, score = sentiment.sentiment_classifier.classify(draft.content, draft.strengths, draft.areas_to_improve)
+    return {"sentiment": suggested.value, "score": round(score, 3)}
+
+@router.get("/feedback/duplicates", response_model=List[schemas.DuplicateCluster])
+def read_duplicate_feedback(
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0, description="Defaults to SIMILARITY_THRESHOLD"),
+    current_user: models.User = Depends(auth.get_current_manager),
+    db: Session = Depends(get_db)
+):
+    """Groups of near-identical feedback written by the current manager"""
+    from ..utils import similarity
+
+    return similarity.duplicate_clusters(
+        db, manager_id=current_user.id, threshold=threshold or similarity.SIMILARITY_THRESHOLD
+    )
+
+EXPORT_CHUNK_SIZE = 500
+
+@router.get("/feedback/export")
+def export_feedback(
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    All feedback the current user gave (managers) or received (employees),
+    including archived feedback, as NDJSON with tags and comments. Current
+    feedback comes first, then archived feedback (``"archived": true``).
+    """
+    is_employee = current_user.role == models.UserRole.EMPLOYEE
+    party = models.Feedback.employee_id if is_employee else models.Feedback.manager_id
+    archived_party = models.ArchivedFeedback.employee_id if is_employee else models.ArchivedFeedback.manager_id
+    user_id = current_user.id
+    in_organization = auth.same_organization(models.Feedback, current_user)
+    # The response is streamed after this handler returns, so it reads through its own session
+    session_info = {"organization_id": db.info.get("organization_id")}
+
+    def rows():
+        export_db = SessionLocal(info=dict(session_info))
+        try:
+            after_id = 0
+            while True:
+                chunk = export_db.query(*serialization.columns(models.Feedback, serialization.FEEDBACK_FIELDS)).filter(
+                    in_organization,
+                    party == user_id,
+                    models.Feedback.id > after_id
+                ).order_by(models.Feedback.id).limit(EXPORT_CHUNK_SIZE).all()
+                if not chunk:
+                    break
+                items = archive.attach_feedback_comments(export_db, serialization.feedback_rows_to_dicts(export_db, chunk))
+                for item in items:
+                    yield orjson.dumps({**item, "archived": False}) + b"\n"
+                after_id = chunk[-1][0]
+            for item in archive.iter_archived_feedback(export_db, archived_party == user_id):
+                item.pop("organization_id", None)
+                yield orjson.dumps({**item, "archived": True}) + b"\n"
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        rows(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="feedback.ndjson"'}
+    )
+
 @router.get("/feedback/{feedback_id}", response_model=schemas.Feedback)
 def read_feedback_by_id(
     feedback_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
+    feedback = db.query(models.Feedback).options(undefer_group("body")).filter(
+        models.Feedback.id == feedback_id
+    ).first()
     
     if not feedback:
-        raise HTTPException(status_code=404, detail="Feedback not found")
+        # Old acknowledged feedback may have been moved to the archive
+        archived = archive.read_archived_feedback(db, feedback_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Feedback not found")
+        manager_id, employee_id = archived["manager_id"], archived["employee_id"]
+    else:
+        manager_id, employee_id = feedback.manager_id, feedback.employee_id
     
     # Check if user is authorized to view this feedback
-    if (current_user.role == models.UserRole.EMPLOYEE and feedback.employee_id != current_user.id) or \
-       (current_user.role == models.UserRole.MANAGER and feedback.manager_id != current_user.id):
+    if (current_user.role == models.UserRole.EMPLOYEE and employee_id != current_user.id) or \
+       (current_user.role == models.UserRole.MANAGER and manager_id != current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this feedback"
         )
     
-    return feedback
+    if feedback:
+        return feedback
+    archived.pop("organization_id", None)
+    return ORJSONResponse(archived)
+
+@router.get("/feedback/{feedback_id}/similar", response_model=List[schemas.SimilarFeedback])
+def read_similar_feedback(
+    feedback_id: int,
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0, description="Defaults to SIMILARITY_THRESHOLD"),
+    current_user: models.User = Depends(auth.get_current_manager),
+    db: Session = Depends(get_db)
+):
+    """Other feedback by the same manager with near-identical text"""
+    from ..utils import similarity
+
+    manager_id = db.query(models.Feedback.manager_id).filter(models.Feedback.id == feedback_id).scalar()
+    if manager_id is None:
+        raise HTTPException(status_code=404, detail="Feedback not found")
+    if manager_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this feedback"
+        )
+
+    matches = similarity.similar_feedback(db, feedback_id, threshold or similarity.SIMILARITY_THRESHOLD)
+    employees = dict(db.query(models.Feedback.id, models.Feedback.employee_id).filter(
+        models.Feedback.id.in_([match_id for match_id, _ in matches])
+    ).all())
+    return [
+        {"feedback_id": match_id, "employee_id": employees.get(match_id), "similarity": round(score, 3)}
+        for match_id, score in matches
+    ]
 
 @router.put("/feedback/{feedback_id}", response_model=schemas.Feedback)
 def update_feedback(
@@ -179,7 +335,9 @@ def update_feedback(
     current_user: models.User = Depends(auth.get_current_manager),
     db: Session = Depends(get_db)
 ):
-    db_feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
+    db_feedback = db.query(models.Feedback).options(undefer_group("body")).filter(
+        models.Feedback.id == feedback_id
+    ).first()
     
     if not db_feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
@@ -192,12 +350,17 @@ def update_feedback(
         )
     
     # Update feedback fields
-    for key, value in feedback.dict(exclude_unset=True).items():
+    changes = feedback.dict(exclude_unset=True)
+    for key, value in changes.items():
         setattr(db_feedback, key, value)
     
     db_feedback.updated_at = datetime.utcnow()
+    outbox.record_change(db, "feedback", db_feedback, "updated", db_feedback.manager_id, db_feedback.employee_id)
+    if changes.keys() & {"content", "strengths", "areas_to_improve"}:
+        index_similarity(db, db_feedback)
     db.commit()
     db.refresh(db_feedback)
+    cache.dashboard_cache.invalidate_user(db_feedback.manager_id, db_feedback.employee_id)
     
     return db_feedback
 
@@ -207,7 +370,9 @@ def acknowledge_feedback(
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
+    feedback = db.query(models.Feedback).options(undefer_group("body")).filter(
+        models.Feedback.id == feedback_id
+    ).first()
     
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
@@ -219,8 +384,10 @@ def acknowledge_feedback(
         )
     
     feedback.is_acknowledged = True
+    outbox.record_change(db, "feedback", feedback, "acknowledged", feedback.manager_id, feedback.employee_id)
     db.commit()
     db.refresh(feedback)
+    cache.dashboard_cache.invalidate_user(feedback.manager_id, feedback.employee_id)
     
     # Send notification to manager
     notifications.notify_feedback_acknowledged(db, feedback)
@@ -248,14 +415,97 @@ def create_feedback_comment(
     
     db_comment = models.FeedbackComment(
         feedback_id=feedback_id,
-        comment=comment.comment
+        user_id=current_user.id,
+        comment=comment.comment,
+        organization_id=feedback.organization_id
     )
     
     db.add(db_comment)
+    db.flush()
+    # Counted in SQL so concurrent comments don't lose increments; rows not backfilled yet
+    # (count still null) are counted in full. updated_at stays the time of the last edit
+    db.query(models.Feedback).filter(models.Feedback.id == feedback_id).update({
+        models.Feedback.comment_count: func.coalesce(
+            models.Feedback.comment_count + 1,
+            select(func.count(models.FeedbackComment.id)).where(
+                models.FeedbackComment.feedback_id == feedback_id
+            ).scalar_subquery(),
+        ),
+        models.Feedback.last_activity_at: func.now(),
+        models.Feedback.updated_at: models.Feedback.updated_at,
+    }, synchronize_session=False)
+    outbox.record_change(db, "comment", db_comment, "created", feedback.manager_id, feedback.employee_id)
     db.commit()
     db.refresh(db_comment)
+    # Dashboards list recent feedback with its comment count
+    cache.dashboard_cache.invalidate_user(feedback.manager_id, feedback.employee_id)
     
     # Send notification about the comment
     notifications.notify_new_comment(db, db_comment, feedback)
     
     return db_comment
+
+@router.get("/feedback/{feedback_id}/comments/", response_model=schemas.FeedbackCommentPage)
+def read_feedback_comments(
+    feedback_id: int,
+    after: Optional[int] = Query(None, description="Id of the last comment already read"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Comments on a feedback oldest first, with their author's name. Pass
+    ``next_after`` from the previous page as ``after`` while ``has_more``.
+    """
+    parties = db.query(models.Feedback.manager_id, models.Feedback.employee_id).filter(
+        models.Feedback.id == feedback_id
+    ).first()
+    archived = None
+    if parties is None:
+        archived = archive.read_archived_feedback(db, feedback_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Feedback not found")
+        parties = (archived["manager_id"], archived["employee_id"])
+    manager_id, employee_id = parties
+    if (current_user.role == models.UserRole.EMPLOYEE and employee_id != current_user.id) or \
+       (current_user.role == models.UserRole.MANAGER and manager_id != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this feedback"
+        )
+
+    if archived is not None:
+        # The whole thread is in the segment; page it in memory
+        comments = [
+            {"feedback_id": feedback_id, "user_id": None, **item}
+            for item in archived["comments"] if after is None or item["id"] > after
+        ][:limit + 1]
+        names = dict(db.query(models.User.id, models.User.full_name).filter(
+            models.User.id.in_({item["user_id"] for item in comments if item["user_id"]})
+        ).all())
+        for item in comments:
+            item["author_name"] = names.get(item["user_id"])
+    else:
+        Comment = models.FeedbackComment
+        query = db.query(
+            Comment.id, Comment.feedback_id, Comment.user_id, Comment.comment, Comment.created_at,
+            models.User.full_name.label("author_name"),
+        ).outerjoin(models.User, models.User.id == Comment.user_id).filter(Comment.feedback_id == feedback_id)
+        if after is not None:
+            # Keyset on the (feedback_id, created_at) index. The bound is the stored created_at of
+            # the last comment read, so it compares exactly whatever format the database keeps
+            position = db.query(Comment.created_at).filter(Comment.id == after).scalar_subquery()
+            query = query.filter(or_(
+                Comment.created_at > position,
+                and_(Comment.created_at == position, Comment.id > after),
+            ))
+        rows = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+        comments = [row._asdict() for row in rows]
+
+    has_more = len(comments) > limit
+    comments = comments[:limit]
+    return ORJSONResponse({
+        "comments": comments,
+        "next_after": comments[-1]["id"] if comments else after,
+        "has_more": has_more,
+    })
@@ -1,30 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from .. import models, schemas, auth
 from ..database import get_db
-from ..utils import notifications
+from ..utils import notifications, outbox
+from ..utils.reporting import reporting_index
 
 router = APIRouter()
 
+def _pending_request_for(db: Session, employee_id: int):
+    return db.query(models.FeedbackRequest).filter(
+        models.FeedbackRequest.status == models.FeedbackRequestStatus.PENDING,
+        models.FeedbackRequest.employee_id == employee_id
+    ).first()
+
 @router.post("/feedback-requests/", response_model=schemas.FeedbackRequest)
 def create_feedback_request(
     request: schemas.FeedbackRequestCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
-):    # Create a new feedback request
+):
+    # An employee has at most one pending request; repeated clicks return it
+    existing = _pending_request_for(db, current_user.id)
+    if existing:
+        return existing
+    
+    # Create a new feedback request
     db_request = models.FeedbackRequest(
-        employee_id=current_user.id
+        employee_id=current_user.id,
+        status=models.FeedbackRequestStatus.PENDING,
+        organization_id=current_user.organization_id
     )
     
-    db.add(db_request)
-    db.commit()
+    try:
+        db.add(db_request)
+        outbox.record_change(db, "feedback_request", db_request, "created", current_user.manager_id, current_user.id)
+        db.commit()
+    except IntegrityError:
+        # A concurrent request created the pending row first (unique pending index)
+        db.rollback()
+        existing = _pending_request_for(db, current_user.id)
+        if existing:
+            return existing
+        raise
     db.refresh(db_request)
     
     # If the employee has a manager, send a notification to the manager
-    employee = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if employee and employee.manager_id:
+    if current_user.manager_id:
         notifications.notify_feedback_request(db, db_request)
     
     return db_request
@@ -33,23 +58,61 @@ def create_feedback_request(
 def read_feedback_requests(
     skip: int = 0,
     limit: int = 100,
+    status: Optional[schemas.FeedbackRequestStatus] = None,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role == models.UserRole.EMPLOYEE:
         # Employee sees their own requests
-        requests = db.query(models.FeedbackRequest).filter(
+        query = db.query(models.FeedbackRequest).filter(
+            auth.same_organization(models.FeedbackRequest, current_user),
             models.FeedbackRequest.employee_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        )
     else:
         # Manager sees requests from their employees
-        requests = db.query(models.FeedbackRequest).join(
+        query = db.query(models.FeedbackRequest).join(
             models.User, models.FeedbackRequest.employee_id == models.User.id
         ).filter(
+            auth.same_organization(models.FeedbackRequest, current_user),
             models.User.manager_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        )
+    
+    if status:
+        query = query.filter(models.FeedbackRequest.status == status)
+    
+    return query.offset(skip).limit(limit).all()
+
+@router.get("/feedback-requests/queue", response_model=List[schemas.FeedbackRequest])
+def read_pending_queue(
+    after_id: Optional[int] = Query(None, description="Id of the last request on the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: models.User = Depends(auth.get_current_manager),
+    db: Session = Depends(get_db)
+):
+    """
+    Pending requests from the manager's reports, oldest first. Pages by
+    keyset on (created_at, id): pass the last id seen as ``after_id``.
+    """
+    # Served by the (status, employee_id, created_at) index for each report
+    query = db.query(models.FeedbackRequest).join(
+        models.User, models.FeedbackRequest.employee_id == models.User.id
+    ).filter(
+        auth.same_organization(models.FeedbackRequest, current_user),
+        models.User.manager_id == current_user.id,
+        models.FeedbackRequest.status == models.FeedbackRequestStatus.PENDING
+    )
     
-    return requests
+    if after_id is not None:
+        cursor = db.query(models.FeedbackRequest.created_at, models.FeedbackRequest.id).filter(
+            models.FeedbackRequest.id == after_id
+        ).first()
+        if cursor:
+            query = query.filter(or_(
+                models.FeedbackRequest.created_at > cursor.created_at,
+                and_(models.FeedbackRequest.created_at == cursor.created_at, models.FeedbackRequest.id > cursor.id)
+            ))
+    
+    return query.order_by(models.FeedbackRequest.created_at, models.FeedbackRequest.id).limit(limit).all()
 
 @router.get("/feedback-requests/{request_id}", response_model=schemas.FeedbackRequest)
 def read_feedback_request(
@@ -72,11 +135,7 @@ def read_feedback_request(
                 detail="Not authorized to access this feedback request"
             )
     else:  # Manager
-        employee = db.query(models.User).filter(
-            models.User.id == request.employee_id,
-            models.User.manager_id == current_user.id
-        ).first()
-        if not employee:
+        if not reporting_index.is_report(db, current_user.id, request.employee_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to access this feedback request"
@@ -0,0 +1,51 @@
+from anyio import to_thread
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from ..database import pool_stats
+from ..utils.cache import dashboard_cache
+from ..utils.health import database_probe
+from ..utils.ratelimit import load_stats
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def liveness():
+    """Liveness: the worker's event loop is responding. Touches nothing else."""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readiness():
+    """
+    Readiness: 200 when the primary database answers within the timeout and
+    the worker isn't shedding load, 503 otherwise. Also reports connection
+    pool, threadpool, request queue and background refresh counts for
+    autoscaling. Database round-trips are shared between probes, so polling
+    every second is cheap.
+    """
+    database = await database_probe.check()
+    pools = pool_stats()
+    load = load_stats()
+    limiter = to_thread.current_default_thread_limiter()
+
+    reasons = []
+    if not database["ok"]:
+        reasons.append("database")
+    primary = pools["primary"]
+    if primary.get("capacity") is not None and primary["checked_out"] >= primary["capacity"]:
+        reasons.append("connection pool exhausted")
+    if load and load["queued"] >= load["max_queued"]:
+        reasons.append("request queue full")
+
+    return ORJSONResponse(
+        {
+            "status": "not ready" if reasons else "ready",
+            "reasons": reasons,
+            "database": database,
+            "pools": pools,
+            "requests": load,
+            "threadpool": {"busy": limiter.borrowed_tokens, "size": limiter.total_tokens},
+            "background": {"dashboard_refreshes": dashboard_cache.background_refreshes},
+        },
+        status_code=503 if reasons else 200,
+    )
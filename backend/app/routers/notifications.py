@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 
 from .. import models, schemas, auth
 from ..database import get_db
+from ..utils import serialization
+from ..utils.params import field_selector
 
 router = APIRouter()
 
@@ -11,17 +14,20 @@ router = APIRouter()
 def read_notifications(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.NOTIFICATION_FIELDS)),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get the current user's notifications"""
-    notifications = db.query(models.Notification).filter(
+    """Get the current user's notifications, optionally only the columns named in ``fields``"""
+    fields = fields or serialization.NOTIFICATION_FIELDS
+    rows = db.query(*serialization.columns(models.Notification, fields)).filter(
+        auth.same_organization(models.Notification, current_user),
         models.Notification.user_id == current_user.id
     ).order_by(
         models.Notification.created_at.desc()
     ).offset(skip).limit(limit).all()
     
-    return notifications
+    return ORJSONResponse(serialization.rows_to_dicts(rows, fields))
 
 @router.put("/notifications/{notification_id}/read")
 def mark_notification_as_read(
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+
+from .. import models, auth
+from ..utils import profiling
+
+router = APIRouter()
+
+@router.get("/admin/profiles")
+def list_profiles(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    """The newest request profiles stored by this host, newest first"""
+    return ORJSONResponse(profiling.list_reports(limit))
+
+@router.get("/admin/profiles/{profile_id}")
+def read_profile(profile_id: str, current_user: models.User = Depends(auth.get_current_admin)):
+    """
+    One request profile: its SQL statements with timings (and the ones
+    repeated, typically a query per row) and the functions that took the
+    most cumulative time
+    """
+    report = profiling.read_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return ORJSONResponse(report)
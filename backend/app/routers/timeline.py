@@ -0,0 +1,143 @@
+import base64
+import heapq
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, false, func, or_, true
+from sqlalchemy.orm import Session
+
+from .. import models, schemas, auth
+from ..database import get_db
+from ..utils.serialization import FEEDBACK_PREVIEW_LENGTH
+
+router = APIRouter()
+
+Item = schemas.TimelineItemType
+
+def _encode_cursor(item: dict) -> str:
+    raw = f"{item['occurred_at'].isoformat()}|{item['type'].value}|{item['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        occurred_at, item_type, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(occurred_at), item_type, int(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _sort_key(item: dict):
+    return item["occurred_at"], item["type"].value, item["id"]
+
+# Table and time column behind each kind of item, to read a cursor item's stored time back
+_SOURCES = {
+    Item.FEEDBACK: (models.Feedback, models.Feedback.created_at),
+    Item.COMMENT: (models.FeedbackComment, models.FeedbackComment.created_at),
+    Item.ACKNOWLEDGEMENT: (models.ChangeEvent, models.ChangeEvent.created_at),
+    Item.REQUEST: (models.FeedbackRequest, models.FeedbackRequest.created_at),
+}
+
+def _cursor_time(db: Session, cursor):
+    """
+    The cursor item's time as the database stores it, so equal times compare
+    equal in SQL (SQLite keeps CURRENT_TIMESTAMP text without the fractional
+    seconds a bound datetime carries); the time in the cursor if it is gone
+    """
+    occurred_at, item_type, item_id = cursor
+    try:
+        model, column = _SOURCES[Item(item_type)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    stored = db.query(column).filter(model.id == item_id).scalar_subquery()
+    return func.coalesce(stored, occurred_at)
+
+def _stream(query, occurred_at_column, id_column, item_type, cursor, cursor_time, limit):
+    """One indexed stream, newest first, starting just after the cursor"""
+    if cursor:
+        # Keyset on (time, type, id) descending; at the cursor's time, kinds sorting
+        # before the cursor's kind come next and its own kind continues below its id
+        _, cursor_type, cursor_id = cursor
+        if item_type.value < cursor_type:
+            same_time = true()
+        elif item_type.value == cursor_type:
+            same_time = id_column < cursor_id
+        else:
+            same_time = false()
+        query = query.filter(
+            occurred_at_column <= cursor_time,
+            or_(occurred_at_column < cursor_time, and_(occurred_at_column == cursor_time, same_time)),
+        )
+    rows = query.order_by(occurred_at_column.desc(), id_column.desc()).limit(limit + 1).all()
+    return [{"type": item_type, **row._asdict()} for row in rows]
+
+@router.get("/timeline", response_model=schemas.TimelinePage)
+def read_timeline(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    The current user's history newest first: feedback given or received,
+    comments on it, acknowledgements and feedback requests (their own, or
+    their reports' for managers). Each kind is read from its own indexed
+    query and the streams are merged; pass ``next_cursor`` to get older items.
+    """
+    user_id = current_user.id
+    position = _decode_cursor(cursor) if cursor else None
+    position_time = _cursor_time(db, position) if position else None
+    is_party = lambda model: or_(model.manager_id == user_id, model.employee_id == user_id)
+
+    feedback = _stream(
+        db.query(
+            models.Feedback.id,
+            models.Feedback.created_at.label("occurred_at"),
+            models.Feedback.id.label("feedback_id"),
+            models.Feedback.manager_id.label("user_id"),
+            func.substr(models.Feedback.content, 1, FEEDBACK_PREVIEW_LENGTH).label("text"),
+        ).filter(is_party(models.Feedback)),
+        models.Feedback.created_at, models.Feedback.id, Item.FEEDBACK, position, position_time, limit,
+    )
+    comments = _stream(
+        db.query(
+            models.FeedbackComment.id,
+            models.FeedbackComment.created_at.label("occurred_at"),
+            models.FeedbackComment.feedback_id,
+            models.FeedbackComment.comment.label("text"),
+        ).join(models.Feedback, models.FeedbackComment.feedback_id == models.Feedback.id).filter(
+            is_party(models.Feedback)
+        ),
+        models.FeedbackComment.created_at, models.FeedbackComment.id, Item.COMMENT, position, position_time, limit,
+    )
+    # Acknowledgement times are only recorded in the change outbox
+    acknowledgements = _stream(
+        db.query(
+            models.ChangeEvent.id,
+            models.ChangeEvent.created_at.label("occurred_at"),
+            models.ChangeEvent.entity_id.label("feedback_id"),
+            models.ChangeEvent.employee_id.label("user_id"),
+        ).filter(
+            is_party(models.ChangeEvent),
+            models.ChangeEvent.entity_type == "feedback",
+            models.ChangeEvent.operation == "acknowledged"
+        ),
+        models.ChangeEvent.created_at, models.ChangeEvent.id, Item.ACKNOWLEDGEMENT, position, position_time, limit,
+    )
+    requests = _stream(
+        db.query(
+            models.FeedbackRequest.id,
+            models.FeedbackRequest.created_at.label("occurred_at"),
+            models.FeedbackRequest.id.label("request_id"),
+            models.FeedbackRequest.employee_id.label("user_id"),
+            models.FeedbackRequest.status.label("text"),
+        ).join(models.User, models.FeedbackRequest.employee_id == models.User.id).filter(
+            or_(models.FeedbackRequest.employee_id == user_id, models.User.manager_id == user_id)
+        ),
+        models.FeedbackRequest.created_at, models.FeedbackRequest.id, Item.REQUEST, position, position_time, limit,
+    )
+
+    merged = list(heapq.merge(feedback, comments, acknowledgements, requests, key=_sort_key, reverse=True))
+    items = merged[:limit]
+    next_cursor = _encode_cursor(items[-1]) if len(merged) > limit else None
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
@@ -1,50 +1,133 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import codecs
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
+
+import orjson
 
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import SessionLocal, get_db
+from ..utils import cache, org_import, serialization
+from ..utils.params import field_selector, parse_ids
+from ..utils.reporting import reporting_index
 
 router = APIRouter()
 
-# Public endpoint to get all managers for registration
 @router.get("/managers/", response_model=List[schemas.User])
-def read_managers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    managers = db.query(models.User).filter(
+def read_managers(skip: int = 0, limit: int = 100,
+                  fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.USER_FIELDS)),
+                  current_user: models.User = Depends(auth.get_current_active_user),
+                  db: Session = Depends(get_db)):
+    """Managers of the current user's organization"""
+    fields = fields or serialization.USER_FIELDS
+    rows = db.query(*serialization.columns(models.User, fields)).filter(
+        auth.same_organization(models.User, current_user),
         models.User.role == models.UserRole.MANAGER
     ).offset(skip).limit(limit).all()
-    return managers
+    return ORJSONResponse(serialization.rows_to_dicts(rows, fields))
+
+def _check_email_available(db: Session, email: str):
+    if db.query(models.User.id).filter(models.User.email == email).first():
+        raise HTTPException(status_code=400, detail="Email already registered")
 
+# Public: self-service signup starts a new organization, with the new user as its first manager
 @router.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Check if user with email already exists
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Check if manager ID is valid if provided
-    if user.manager_id:
-        manager = db.query(models.User).filter(
-            models.User.id == user.manager_id,
-            models.User.role == models.UserRole.MANAGER
-        ).first()
-        if not manager:
-            raise HTTPException(status_code=400, detail="Invalid manager ID")
-    
-    # Create new user
-    hashed_password = auth.get_password_hash(user.password)
+    if user.manager_id is not None or user.organization_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="To join an existing organization, ask one of its managers to add you"
+        )
+    if user.role != models.UserRole.MANAGER:
+        raise HTTPException(
+            status_code=400,
+            detail="Signing up starts a new organization as its manager; employees are added by their manager"
+        )
+    _check_email_available(db, user.email)
+
+    organization = models.Organization(name=f"{user.full_name}'s organization")
+    db.add(organization)
+    db.flush()
     db_user = models.User(
         email=user.email,
         full_name=user.full_name,
-        hashed_password=hashed_password,
+        hashed_password=auth.get_password_hash(user.password),
         role=user.role,
-        manager_id=user.manager_id
+        organization_id=organization.id
     )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+@router.post("/users/reports/", response_model=schemas.User)
+def create_report(user: schemas.ReportCreate,
+                  current_user: models.User = Depends(auth.get_current_manager),
+                  db: Session = Depends(get_db)):
+    """Add a person reporting to the current manager, in the manager's organization"""
+    _check_email_available(db, user.email)
+    db_user = models.User(
+        email=user.email,
+        full_name=user.full_name,
+        hashed_password=auth.get_password_hash(user.password),
+        role=user.role,
+        manager_id=current_user.id,
+        organization_id=current_user.organization_id
+    )
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    # The manager's dashboard shows their employee count
+    cache.dashboard_cache.invalidate_user(current_user.id)
+    reporting_index.add_report(current_user.id, db_user.id)
+    return db_user
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Optional[schemas.ImportFormat] = None,
+    dry_run: bool = False,
+    current_user: models.User = Depends(auth.get_current_manager)
+):
+    """
+    Bulk-create people and reporting lines in the current manager's
+    organization from a CSV (with a header row) or NDJSON body with the
+    fields of UserImportRow; managers are referenced by email and may be
+    declared after their reports. The format follows ``format`` or the
+    Content-Type. Responds with NDJSON: one line per rejected row, then a
+    summary. Valid rows are imported even when others are rejected, unless
+    ``dry_run`` is set.
+    """
+    if format is None:
+        format = schemas.ImportFormat.CSV if "csv" in request.headers.get("content-type", "") else schemas.ImportFormat.NDJSON
+    # Read the body as it arrives; quoted CSV fields may span lines, so lines keep their endings
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    lines = []
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        lines.extend(line + "\n" for line in complete)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        lines.append(pending)
+    organization_id = current_user.organization_id
+
+    def report():
+        # Validation, hashing and inserts run here, in the threadpool, while the report streams out
+        db = SessionLocal()
+        try:
+            for entry in org_import.import_users(
+                db, org_import.parse_rows(lines, format), organization_id=organization_id, dry_run=dry_run
+            ):
+                yield orjson.dumps(entry) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
 @router.get("/users/me/", response_model=schemas.User)
 def read_user_me(current_user: models.User = Depends(auth.get_current_active_user)):
     return current_user
@@ -54,6 +137,7 @@ def update_user_me(user: schemas.UserUpdate,
                  current_user: models.User = Depends(auth.get_current_active_user),
                  db: Session = Depends(get_db)):
     # Update user data
+    auth.forget_user(current_user.email)
     if user.email:
         current_user.email = user.email
     if user.full_name:
@@ -63,17 +147,58 @@ def update_user_me(user: schemas.UserUpdate,
     
     db.commit()
     db.refresh(current_user)
+    if user.password:
+        # Sessions opened with the old password end; the client logs in again
+        auth.revoke_user_tokens(db, current_user)
     return current_user
 
 @router.get("/users/", response_model=List[schemas.User])
 def read_users(skip: int = 0, limit: int = 100, 
+              fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.USER_FIELDS)),
               current_user: models.User = Depends(auth.get_current_manager),
               db: Session = Depends(get_db)):
     # If user is manager, only return their employees
-    users = db.query(models.User).filter(
+    fields = fields or serialization.USER_FIELDS
+    rows = db.query(*serialization.columns(models.User, fields)).filter(
+        auth.same_organization(models.User, current_user),
         models.User.manager_id == current_user.id
     ).offset(skip).limit(limit).all()
-    return users
+    return ORJSONResponse(serialization.rows_to_dicts(rows, fields))
+
+def _readable_user_ids(db: Session, current_user: models.User, user_ids: List[int]) -> set:
+    """The subset of ``user_ids`` that read_user would let ``current_user`` see"""
+    allowed = {current_user.id}
+    if current_user.role == models.UserRole.EMPLOYEE:
+        if current_user.manager_id:
+            allowed.add(current_user.manager_id)
+        givers = reporting_index.feedback_givers_of(db, current_user.id)
+        if not set(user_ids) <= allowed | givers:
+            # Some ids are unknown to the cached set; re-read it once before filtering them out
+            givers = reporting_index.feedback_givers_of(db, current_user.id, refresh=True)
+        allowed |= givers
+    else:
+        reports = reporting_index.reports_of(db, current_user.id)
+        if not set(user_ids) <= allowed | reports:
+            reports = reporting_index.reports_of(db, current_user.id, refresh=True)
+        allowed |= reports
+    return allowed & set(user_ids)
+
+@router.get("/users/batch", response_model=List[schemas.User])
+def read_users_batch(user_ids: List[int] = Depends(parse_ids),
+                     fields: Optional[Tuple[str, ...]] = Depends(field_selector(serialization.USER_FIELDS)),
+                     current_user: models.User = Depends(auth.get_current_active_user),
+                     db: Session = Depends(get_db)):
+    """Look up several users at once, applying the same rules as read_user.
+    Ids that don't exist or aren't visible to the current user are left out."""
+    allowed_ids = _readable_user_ids(db, current_user, user_ids)
+    if not allowed_ids:
+        return []
+    fields = fields or serialization.USER_FIELDS
+    rows = db.query(*serialization.columns(models.User, fields)).filter(
+        auth.same_organization(models.User, current_user),
+        models.User.id.in_(allowed_ids)
+    ).all()
+    return ORJSONResponse(serialization.rows_to_dicts(rows, fields))
 
 @router.get("/users/{user_id}", response_model=schemas.User)
 def read_user(user_id: int, 
@@ -81,31 +206,21 @@ def read_user(user_id: int,
              db: Session = Depends(get_db)):
     # Allow access to own data
     if current_user.id == user_id:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
+        return current_user
     
     # Allow employees to access their manager's data (needed for feedback details)
     if current_user.role == models.UserRole.EMPLOYEE and current_user.manager_id == user_id:
         manager = db.query(models.User).filter(models.User.id == user_id).first()
         if manager is None:
             raise HTTPException(status_code=404, detail="Manager not found")
-        return manager
+        return auth.verify_same_organization(current_user, manager)
     
     # Allow employees to access info for managers who gave them feedback
     if current_user.role == models.UserRole.EMPLOYEE:
         # Check if this user has given feedback to the current employee
-        feedback_exists = db.query(models.Feedback).filter(
-            models.Feedback.manager_id == user_id,
-            models.Feedback.employee_id == current_user.id
-        ).first() is not None
-        
-        if feedback_exists:
+        if reporting_index.gave_feedback(db, user_id, current_user.id):
             manager = db.query(models.User).filter(models.User.id == user_id).first()
-            if manager is None:
-                raise HTTPException(status_code=404, detail="User not found")
-            return manager
+            return auth.verify_same_organization(current_user, manager)
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -113,20 +228,16 @@ def read_user(user_id: int,
             )
     
     # If user is manager, check if employee belongs to them
-    if current_user.role == models.UserRole.MANAGER and current_user.id != user_id:
-        employee = db.query(models.User).filter(
-            models.User.id == user_id,
-            models.User.manager_id == current_user.id
-        ).first()
-        if not employee:
+    if current_user.role == models.UserRole.MANAGER:
+        employee = None
+        if reporting_index.is_report(db, current_user.id, user_id):
+            employee = db.query(models.User).filter(models.User.id == user_id).first()
+        if not employee or employee.organization_id != current_user.organization_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found or not managed by you"
             )
         return employee
     
-    # User is accessing their own data or manager is accessing their own data
     user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return auth.verify_same_organization(current_user, user)
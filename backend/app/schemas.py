@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Union, Any
 from datetime import datetime
 from enum import Enum
 
@@ -13,6 +13,10 @@ class FeedbackSentiment(str, Enum):
     NEUTRAL = "neutral"
     NEGATIVE = "negative"
 
+class FeedbackRequestStatus(str, Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -21,17 +25,38 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
+    # Self-service signup only starts a new organization; these are refused there.
+    # People join an existing organization when its managers add them (ReportCreate, import)
     manager_id: Optional[int] = None
+    organization_id: Optional[int] = None
+
+class ReportCreate(UserBase):
+    """A person a manager adds to their own team"""
+    password: str
 
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
     password: Optional[str] = None
 
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class UserImportRow(BaseModel):
+    """One person in a bulk org chart import (CSV column or NDJSON key per field)"""
+    email: EmailStr
+    full_name: str
+    role: UserRole
+    password: str
+    # Another row of the same import, or an existing manager in the organization
+    manager_email: Optional[EmailStr] = None
+
 class User(UserBase):
     id: int
     is_active: bool
     manager_id: Optional[int] = None
+    organization_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -63,6 +88,49 @@ class Feedback(FeedbackBase):
     created_at: datetime
     updated_at: datetime
     feedback_request_id: Optional[int] = None
+    comment_count: Optional[int] = 0
+    last_activity_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class SentimentSuggestionRequest(BaseModel):
+    content: str
+    strengths: Optional[str] = None
+    areas_to_improve: Optional[str] = None
+
+class SentimentSuggestion(BaseModel):
+    sentiment: FeedbackSentiment
+    score: float
+
+class SimilarFeedback(BaseModel):
+    feedback_id: int
+    employee_id: Optional[int] = None
+    similarity: float
+
+class DuplicateCluster(BaseModel):
+    manager_id: int
+    feedback_ids: List[int]
+    min_similarity: float
+
+class FeedbackView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+class FeedbackSummary(BaseModel):
+    """Feedback without the text bodies, for list views"""
+    id: int
+    manager_id: int
+    employee_id: int
+    sentiment: FeedbackSentiment
+    is_anonymous: Optional[bool] = False
+    is_acknowledged: bool
+    created_at: datetime
+    updated_at: datetime
+    feedback_request_id: Optional[int] = None
+    comment_count: Optional[int] = 0
+    last_activity_at: Optional[datetime] = None
+    preview: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -74,7 +142,7 @@ class FeedbackRequestCreate(BaseModel):
 class FeedbackRequest(BaseModel):
     id: int
     employee_id: int
-    status: str
+    status: FeedbackRequestStatus
     created_at: datetime
 
     class Config:
@@ -87,16 +155,34 @@ class FeedbackCommentCreate(BaseModel):
 class FeedbackComment(BaseModel):
     id: int
     feedback_id: int
+    user_id: Optional[int] = None
     comment: str
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class FeedbackCommentItem(FeedbackComment):
+    author_name: Optional[str] = None
+
+class FeedbackCommentPage(BaseModel):
+    comments: List[FeedbackCommentItem]
+    next_after: Optional[int] = None
+    has_more: bool
+
 # Token Schema
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    # Revoked along with the access token used for the request
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -107,12 +193,12 @@ class ManagerDashboard(BaseModel):
     feedback_count: int
     employees_count: int
     feedback_by_sentiment: dict
-    recent_feedback: List[Feedback]
+    recent_feedback: List[Union[Feedback, FeedbackSummary]]
 
 class EmployeeDashboard(BaseModel):
     feedback_count: int
     feedback_by_sentiment: dict
-    recent_feedback: List[Feedback]
+    recent_feedback: List[Union[Feedback, FeedbackSummary]]
     
 # Notification Schemas
 class Notification(BaseModel):
@@ -126,3 +212,37 @@ class Notification(BaseModel):
     
     class Config:
         from_attributes = True
+
+# Change feed Schemas
+class ChangeEvent(BaseModel):
+    id: int
+    entity_type: str
+    entity_id: int
+    operation: str
+    payload: Optional[Any] = None
+    created_at: datetime
+
+class ChangeFeedPage(BaseModel):
+    changes: List[ChangeEvent]
+    next_since: int
+    has_more: bool
+
+# Timeline Schemas
+class TimelineItemType(str, Enum):
+    FEEDBACK = "feedback"
+    COMMENT = "comment"
+    ACKNOWLEDGEMENT = "acknowledgement"
+    REQUEST = "request"
+
+class TimelineItem(BaseModel):
+    type: TimelineItemType
+    id: int
+    occurred_at: datetime
+    feedback_id: Optional[int] = None
+    request_id: Optional[int] = None
+    user_id: Optional[int] = None
+    text: Optional[str] = None
+
+class TimelinePage(BaseModel):
+    items: List[TimelineItem]
+    next_cursor: Optional[str] = None
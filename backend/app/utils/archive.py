@@ -0,0 +1,179 @@
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+import orjson
+from sqlalchemy import exists, insert
+from sqlalchemy.orm import Session
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; fall back to zlib
+    zstandard = None
+
+from .. import models
+from . import serialization
+
+ARCHIVE_FEEDBACK_AFTER_DAYS = float(os.getenv("ARCHIVE_FEEDBACK_AFTER_DAYS", "365"))
+ARCHIVE_NOTIFICATIONS_AFTER_DAYS = float(os.getenv("ARCHIVE_NOTIFICATIONS_AFTER_DAYS", "90"))
+ARCHIVE_SEGMENT_SIZE = int(os.getenv("ARCHIVE_SEGMENT_SIZE", "1000"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "9"))
+
+FEEDBACK = "feedback"
+NOTIFICATION = "notification"
+
+def _compress(data: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read archive segments written with zstd")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def _write_segment(db: Session, kind: str, rows: List[dict]) -> int:
+    codec, data = _compress(b"\n".join(orjson.dumps(row) for row in rows))
+    segment = models.ArchiveSegment(
+        kind=kind, codec=codec, row_count=len(rows), min_id=rows[0]["id"], max_id=rows[-1]["id"], data=data
+    )
+    db.add(segment)
+    db.flush()
+    return segment.id
+
+def _segment_rows(db: Session, segment_id: int) -> List[dict]:
+    codec, data = db.query(models.ArchiveSegment.codec, models.ArchiveSegment.data).filter(
+        models.ArchiveSegment.id == segment_id
+    ).one()
+    return [orjson.loads(line) for line in _decompress(codec, data).split(b"\n")]
+
+def attach_feedback_comments(db: Session, items: List[dict]) -> List[dict]:
+    """Fill in ``comments`` for feedback payloads with one query for the whole batch"""
+    comments = defaultdict(list)
+    if items:
+        rows = db.query(
+            models.FeedbackComment.feedback_id, models.FeedbackComment.id, models.FeedbackComment.user_id,
+            models.FeedbackComment.comment, models.FeedbackComment.created_at
+        ).filter(
+            models.FeedbackComment.feedback_id.in_([item["id"] for item in items])
+        ).order_by(models.FeedbackComment.id).all()
+        for feedback_id, comment_id, user_id, comment, created_at in rows:
+            comments[feedback_id].append(
+                {"id": comment_id, "user_id": user_id, "comment": comment, "created_at": created_at}
+            )
+    for item in items:
+        item["comments"] = comments.get(item["id"], [])
+    return items
+
+def _archive_feedback_chunk(db: Session, cutoff: datetime, after_id: int, limit: int) -> Optional[tuple]:
+    """Archive the next chunk of eligible feedback; returns (last id, row count), None when done"""
+    fields = serialization.FEEDBACK_FIELDS + ("organization_id",)
+    rows = db.query(*serialization.columns(models.Feedback, fields)).filter(
+        models.Feedback.is_acknowledged == True,  # noqa: E712
+        models.Feedback.created_at < cutoff,
+        models.Feedback.id > after_id,
+        # Feedback still referenced by a live notification stays hot
+        ~exists().where(models.Notification.related_feedback_id == models.Feedback.id)
+    ).order_by(models.Feedback.id).limit(limit).all()
+    if not rows:
+        return None
+
+    items = attach_feedback_comments(db, serialization.attach_feedback_tags(db, serialization.rows_to_dicts(rows, fields)))
+    segment_id = _write_segment(db, FEEDBACK, items)
+    db.execute(insert(models.ArchivedFeedback), [
+        {
+            "feedback_id": item["id"],
+            "segment_id": segment_id,
+            "organization_id": item["organization_id"],
+            "manager_id": item["manager_id"],
+            "employee_id": item["employee_id"],
+            "created_at": item["created_at"],
+        }
+        for item in items
+    ])
+
+    ids = [item["id"] for item in items]
+    for model in (models.FeedbackComment, models.FeedbackTag, models.FeedbackLshBucket, models.FeedbackSignature):
+        db.query(model).filter(model.feedback_id.in_(ids)).delete(synchronize_session=False)
+    db.query(models.Feedback).filter(models.Feedback.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return ids[-1], len(ids)
+
+def _archive_notification_chunk(db: Session, cutoff: datetime, after_id: int, limit: int) -> Optional[tuple]:
+    fields = serialization.NOTIFICATION_FIELDS + ("organization_id",)
+    rows = db.query(*serialization.columns(models.Notification, fields)).filter(
+        models.Notification.read == True,  # noqa: E712
+        models.Notification.created_at < cutoff,
+        models.Notification.id > after_id
+    ).order_by(models.Notification.id).limit(limit).all()
+    if not rows:
+        return None
+
+    items = serialization.rows_to_dicts(rows, fields)
+    _write_segment(db, NOTIFICATION, items)
+    db.query(models.Notification).filter(
+        models.Notification.id.in_([item["id"] for item in items])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return items[-1]["id"], len(items)
+
+def archive_old_rows(db: Session, feedback_days: float = ARCHIVE_FEEDBACK_AFTER_DAYS,
+                     notification_days: float = ARCHIVE_NOTIFICATIONS_AFTER_DAYS,
+                     segment_size: int = ARCHIVE_SEGMENT_SIZE) -> dict:
+    """
+    Move read notifications older than ``notification_days`` and acknowledged
+    feedback older than ``feedback_days`` out of the hot tables.
+
+    Rows are written ``segment_size`` at a time as compressed NDJSON segments
+    (zstd when available, zlib otherwise) into ``archive_segments``; archived
+    feedback keeps its tags and comments inside the segment and gets an
+    ``archived_feedback`` index row so it can still be read by id, by party
+    and exported. Each segment is committed together with the deletes from
+    the hot tables. Notifications go first, so feedback whose notifications
+    were archived can follow in the same run. Returns the number of rows
+    archived per kind.
+    """
+    now = datetime.utcnow()
+    archived = {NOTIFICATION: 0, FEEDBACK: 0}
+    for kind, archive_chunk, days in (
+        (NOTIFICATION, _archive_notification_chunk, notification_days),
+        (FEEDBACK, _archive_feedback_chunk, feedback_days),
+    ):
+        cutoff = now - timedelta(days=days)
+        after_id = 0
+        while True:
+            result = archive_chunk(db, cutoff, after_id, segment_size)
+            if result is None:
+                break
+            after_id, count = result
+            archived[kind] += count
+    return archived
+
+def read_archived_feedback(db: Session, feedback_id: int) -> Optional[dict]:
+    """The archived feedback with this id, as stored (with tags and comments), or None"""
+    segment_id = db.query(models.ArchivedFeedback.segment_id).filter(
+        models.ArchivedFeedback.feedback_id == feedback_id
+    ).scalar()
+    if segment_id is None:
+        return None
+    for row in _segment_rows(db, segment_id):
+        if row["id"] == feedback_id:
+            return row
+    return None
+
+def iter_archived_feedback(db: Session, *criteria) -> Iterator[dict]:
+    """Archived feedback matching ``criteria`` on ArchivedFeedback, decompressing each segment once"""
+    entries = db.query(models.ArchivedFeedback.segment_id, models.ArchivedFeedback.feedback_id).filter(
+        *criteria
+    ).order_by(models.ArchivedFeedback.segment_id, models.ArchivedFeedback.feedback_id).all()
+    wanted = defaultdict(set)
+    for segment_id, feedback_id in entries:
+        wanted[segment_id].add(feedback_id)
+    for segment_id, ids in wanted.items():
+        for row in _segment_rows(db, segment_id):
+            if row["id"] in ids:
+                yield row
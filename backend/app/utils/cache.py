@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+from ..database import SessionLocal
+
+class _Flight:
+    """A computation in progress that concurrent callers can wait on"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.started_at = time.time()  # wall clock, comparable across processes
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlightCache:
+    """
+    Per-process cache combining single-flight and stale-while-revalidate.
+
+    Concurrent misses for the same key share one computation. Entries younger
+    than ``fresh_seconds`` are served as-is; entries up to ``stale_seconds``
+    older than that are served immediately while one background refresh runs.
+    Entries are grouped by user id so a user's writes can invalidate them.
+
+    Invalidation only reaches this process. A caller that knows when its
+    client last wrote (the X-Last-Write header or cookie, see database.py)
+    passes it as ``not_before``: entries and computations started before
+    then are ignored, so the client sees its write whichever worker it
+    reaches.
+    """
+
+    def __init__(self, fresh_seconds: float, stale_seconds: float, session_factory=SessionLocal):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.session_factory = session_factory
+        self._entries = {}      # key -> (user_id, value, computed_at, started_at)
+        self._flights = {}      # key -> _Flight
+        self._generations = {}  # user_id -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self.background_refreshes = 0  # running now
+
+    def get_or_compute(self, user_id: int, key, compute, db, not_before: float = 0.0):
+        """Return the cached value for ``key``, calling ``compute(db)`` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[3] >= not_before:
+                _, value, computed_at, _ = entry
+                age = time.monotonic() - computed_at
+                if age < self.fresh_seconds:
+                    return value
+                if age < self.fresh_seconds + self.stale_seconds:
+                    if key not in self._flights:
+                        self._start_background_refresh(user_id, key, compute, db.info.get("organization_id"))
+                    return value
+
+            flight = self._flights.get(key)
+            is_leader = flight is None or flight.started_at < not_before
+            if is_leader:
+                flight = self._flights[key] = _Flight(user_id)
+                generation = self._generations.get(user_id, 0)
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        self._run(user_id, key, generation, flight, compute, db)
+        if flight.error:
+            raise flight.error
+        return flight.value
+
+    def invalidate_user(self, *user_ids: int):
+        """Drop cached values and pending computations for the given users"""
+        with self._lock:
+            for user_id in user_ids:
+                if user_id is None:
+                    continue
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [k for k, entry in self._entries.items() if entry[0] in user_ids]:
+                del self._entries[key]
+            # Results of computations started before the write must not be shared with new requests
+            for key in [k for k, flight in self._flights.items() if flight.user_id in user_ids]:
+                del self._flights[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _start_background_refresh(self, user_id, key, compute, organization_id=None):
+        # Called with the lock held
+        flight = self._flights[key] = _Flight(user_id)
+        generation = self._generations.get(user_id, 0)
+
+        def refresh():
+            db = self.session_factory()
+            # Read from the same tenant database as the request that triggered the refresh
+            db.info["organization_id"] = organization_id
+            try:
+                self._run(user_id, key, generation, flight, compute, db)
+                if flight.error:
+                    print(f"Background refresh failed for {key}: {flight.error}")
+            finally:
+                db.close()
+                with self._lock:
+                    self.background_refreshes -= 1
+
+        self.background_refreshes += 1
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _run(self, user_id, key, generation, flight, compute, db):
+        try:
+            flight.value = compute(db)
+        except Exception as e:
+            flight.error = e
+
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # Skip storing if the user wrote something while we were computing, or a newer result is in
+            entry = self._entries.get(key)
+            if flight.error is None and self._generations.get(user_id, 0) == generation and \
+                    (entry is None or entry[3] <= flight.started_at):
+                self._entries[key] = (user_id, flight.value, time.monotonic(), flight.started_at)
+        flight.done.set()
+
+# Dashboard results per (endpoint, user id, view); invalidated by the user's feedback writes
+dashboard_cache = SingleFlightCache(
+    fresh_seconds=float(os.getenv("DASHBOARD_CACHE_FRESH_SECONDS", "5")),
+    stale_seconds=float(os.getenv("DASHBOARD_CACHE_STALE_SECONDS", "30")),
+)
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from ..database import engine
+
+READINESS_DB_TIMEOUT_SECONDS = float(os.getenv("READINESS_DB_TIMEOUT_SECONDS", "1"))
+# Probes within this interval share one database round-trip
+READINESS_CHECK_INTERVAL_SECONDS = float(os.getenv("READINESS_CHECK_INTERVAL_SECONDS", "0.5"))
+
+class DatabaseProbe:
+    """
+    ``SELECT 1`` against the primary, at most once per ``interval`` seconds.
+
+    The query runs on a dedicated thread, never on the request threadpool,
+    and only one runs at a time: when the database or the connection pool
+    hangs, frequent probes wait on the same pending check (and report it as
+    timed out) instead of piling up blocked threads.
+    """
+
+    def __init__(self, bind, timeout: float, interval: float):
+        self.bind = bind
+        self.timeout = timeout
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readiness")
+        self._future = None
+        self._started_at = 0.0
+
+    def _round_trip(self):
+        started = time.perf_counter()
+        with self.bind.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return (time.perf_counter() - started) * 1000
+
+    async def check(self) -> dict:
+        now = time.monotonic()
+        if self._future is None or (self._future.done() and now - self._started_at >= self.interval):
+            self._future = self._executor.submit(self._round_trip)
+            self._started_at = now
+        future = self._future
+        try:
+            # shield: a probe giving up must not cancel the check other probes share
+            latency_ms = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"no response within {self.timeout}s",
+                    "pending_for_ms": round((time.monotonic() - self._started_at) * 1000, 1)}
+        except Exception as exc:
+            return {"ok": False, "error": str(exc)}
+        return {"ok": True, "latency_ms": round(latency_ms, 2)}
+
+database_probe = DatabaseProbe(engine, READINESS_DB_TIMEOUT_SECONDS, READINESS_CHECK_INTERVAL_SECONDS)
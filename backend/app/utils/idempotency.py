@@ -0,0 +1,289 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from .. import models
+from ..database import SessionLocal
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# A claimed key whose request never finished (e.g. the worker died) is freed after this
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS", "300"))
+# How often expired records are deleted from the table
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "600"))
+
+# POST endpoints that honour the Idempotency-Key header
+IDEMPOTENT_PATHS = (
+    re.compile(r"^/api/feedback/$"),
+    re.compile(r"^/api/feedback/\d+/comments/$"),
+    re.compile(r"^/api/feedback-requests/$"),
+)
+
+NEW, DONE, IN_PROGRESS, MISMATCH = "new", "done", "in_progress", "mismatch"
+
+class IdempotencyStore:
+    """
+    Recent idempotency keys and their stored responses.
+
+    Completed responses are kept in a bounded in-memory LRU in front of the
+    ``idempotency_records`` table; the table is what makes keys visible to
+    every worker and what detects concurrent retries (unique user/key pair).
+    Both expire after ``ttl_seconds``; a key still in progress after
+    ``in_progress_timeout`` is taken over by the next request using it.
+    Expired rows are deleted every ``purge_interval`` seconds.
+    """
+
+    def __init__(self, ttl_seconds: int, max_cached: int, session_factory=SessionLocal,
+                 in_progress_timeout: int = IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS,
+                 purge_interval: float = IDEMPOTENCY_PURGE_INTERVAL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_cached = max_cached
+        self.session_factory = session_factory
+        self.in_progress_timeout = in_progress_timeout
+        self.purge_interval = purge_interval
+        self._cache = OrderedDict()  # (user_key, key) -> (record dict, stored_at)
+        self._lock = threading.Lock()
+        self._purged_at = None
+
+    def begin(self, user_key: str, key: str, method_path: str, request_hash: str):
+        """Claim ``key`` for a new request, or return the existing record's state"""
+        cached = self._cached(user_key, key)
+        if cached:
+            return (DONE, cached) if cached["request_hash"] == request_hash else (MISMATCH, None)
+
+        db = self.session_factory()
+        try:
+            self._purge_if_due(db)
+            db.add(models.IdempotencyRecord(
+                user_key=user_key, key=key, method_path=method_path, request_hash=request_hash
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                record = db.query(models.IdempotencyRecord).filter(
+                    models.IdempotencyRecord.user_key == user_key,
+                    models.IdempotencyRecord.key == key
+                ).first()
+                if record is None:
+                    # Lost a race with a release; let the caller retry normally
+                    return IN_PROGRESS, None
+                age = self._age(record)
+                if age > self.ttl_seconds or (record.status_code is None and age > self.in_progress_timeout):
+                    # Expired, or abandoned mid-request: the key is free again
+                    return self._take_over(db, record, method_path, request_hash)
+                if record.request_hash != request_hash:
+                    return MISMATCH, None
+                if record.status_code is None:
+                    return IN_PROGRESS, None
+                stored = self._to_dict(record)
+                self._remember(user_key, key, stored, age)
+                return DONE, stored
+            return NEW, None
+        finally:
+            db.close()
+
+    def _take_over(self, db, record, method_path: str, request_hash: str):
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=min(self.ttl_seconds, self.in_progress_timeout))
+        # Conditional on the row still being stale, so only one of several concurrent retries wins
+        claimed = db.query(models.IdempotencyRecord).filter(
+            models.IdempotencyRecord.id == record.id,
+            models.IdempotencyRecord.created_at < stale_before
+        ).update({
+            models.IdempotencyRecord.method_path: method_path,
+            models.IdempotencyRecord.request_hash: request_hash,
+            models.IdempotencyRecord.status_code: None,
+            models.IdempotencyRecord.content_type: None,
+            models.IdempotencyRecord.response_body: None,
+            models.IdempotencyRecord.created_at: now,
+        }, synchronize_session=False)
+        db.commit()
+        with self._lock:
+            self._cache.pop((record.user_key, record.key), None)
+        return (NEW, None) if claimed else (IN_PROGRESS, None)
+
+    @staticmethod
+    def _age(record) -> float:
+        created_at = record.created_at
+        if created_at.tzinfo is None:
+            # SQLite hands back its UTC timestamps without a zone
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+    def complete(self, user_key: str, key: str, status_code: int, content_type: str, body: bytes):
+        db = self.session_factory()
+        try:
+            record = db.query(models.IdempotencyRecord).filter(
+                models.IdempotencyRecord.user_key == user_key,
+                models.IdempotencyRecord.key == key
+            ).first()
+            if record is None:
+                return
+            record.status_code = status_code
+            record.content_type = content_type
+            record.response_body = body.decode("utf-8")
+            db.commit()
+            self._remember(user_key, key, self._to_dict(record))
+        finally:
+            db.close()
+
+    def release(self, user_key: str, key: str):
+        """Forget a claimed key so the request can be retried (used after server errors)"""
+        db = self.session_factory()
+        try:
+            db.query(models.IdempotencyRecord).filter(
+                models.IdempotencyRecord.user_key == user_key,
+                models.IdempotencyRecord.key == key
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def _cached(self, user_key, key):
+        with self._lock:
+            entry = self._cache.get((user_key, key))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._cache[(user_key, key)]
+                return None
+            self._cache.move_to_end((user_key, key))
+            return entry[0]
+
+    def _remember(self, user_key, key, stored, age: float = 0.0):
+        with self._lock:
+            # Dated by the record, so the cache never outlives the table's expiry
+            self._cache[(user_key, key)] = (stored, time.monotonic() - age)
+            self._cache.move_to_end((user_key, key))
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _purge_if_due(self, db):
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = now
+        self._purge_expired(db)
+
+    def _purge_expired(self, db):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        db.query(models.IdempotencyRecord).filter(models.IdempotencyRecord.created_at < cutoff).delete()
+        db.commit()
+
+    @staticmethod
+    def _to_dict(record):
+        return {
+            "request_hash": record.request_hash,
+            "status_code": record.status_code,
+            "content_type": record.content_type,
+            "body": record.response_body,
+        }
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_CACHE_SIZE)
+
+def _token_subject(headers):
+    """Subject of the bearer token, used to scope keys per user (None if absent/invalid)"""
+    from jose import JWTError
+    from .. import auth
+
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return auth.decode_token(token).get("sub")
+    except JWTError:
+        return None
+
+class IdempotencyMiddleware:
+    """
+    Honour ``Idempotency-Key`` on the create endpoints in IDEMPOTENT_PATHS.
+
+    The first request with a key runs normally and its response is stored;
+    retries with the same key and body get the stored response back (with an
+    ``Idempotent-Replayed: true`` header) without running the handler again.
+    A retry while the first request is still running gets 409, reusing a key
+    with a different body gets 422. Server errors are not stored.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or \
+           not any(pattern.match(scope["path"]) for pattern in IDEMPOTENT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        user_key = _token_subject(headers) if key else None
+        if not user_key:
+            await self.app(scope, receive, send)
+            return
+
+        # Buffer the request body so it can be hashed and then replayed to the app
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        method_path = f"{scope['method']} {scope['path']}"
+        request_hash = hashlib.sha256(method_path.encode() + b"\n" + body).hexdigest()
+        state, stored = await run_in_threadpool(self.store.begin, user_key, key, method_path, request_hash)
+
+        if state == DONE:
+            response = Response(
+                content=stored["body"],
+                status_code=stored["status_code"],
+                media_type=stored["content_type"],
+                headers={"Idempotent-Replayed": "true"},
+            )
+            await response(scope, replay_receive, send)
+            return
+        if state == IN_PROGRESS:
+            response = JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+            await response(scope, replay_receive, send)
+            return
+        if state == MISMATCH:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+            )
+            await response(scope, replay_receive, send)
+            return
+
+        status_code = 500
+        content_type = None
+        chunks = []
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if status_code >= 500:
+                await run_in_threadpool(self.store.release, user_key, key)
+            else:
+                await run_in_threadpool(self.store.complete, user_key, key, status_code, content_type, b"".join(chunks))
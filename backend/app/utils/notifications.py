@@ -11,7 +11,8 @@ def notify_new_feedback(db: Session, feedback: models.Feedback):
             user_id=feedback.employee_id,
             message=f"You have received new feedback from {feedback.manager.full_name}",
             read=False,
-            related_feedback_id=feedback.id
+            related_feedback_id=feedback.id,
+            organization_id=feedback.organization_id
         )
         db.add(notification)
         db.commit()
@@ -32,7 +33,8 @@ def notify_feedback_acknowledged(db: Session, feedback: models.Feedback):
             user_id=feedback.manager_id,
             message=f"{feedback.employee.full_name} has acknowledged your feedback",
             read=False,
-            related_feedback_id=feedback.id
+            related_feedback_id=feedback.id,
+            organization_id=feedback.organization_id
         )
         db.add(notification)
         db.commit()
@@ -56,7 +58,8 @@ def notify_feedback_request(db: Session, request: models.FeedbackRequest):
                 user_id=employee.manager_id,
                 message=f"{employee.full_name} has requested feedback",
                 read=False,
-                related_request_id=request.id
+                related_request_id=request.id,
+                organization_id=request.organization_id
             )
             db.add(notification)
             db.commit()
@@ -74,7 +77,7 @@ def notify_new_comment(db: Session, comment: models.FeedbackComment, feedback: m
     """
     try:
         # Determine who to notify (if employee commented, notify manager and vice versa)
-        current_user_id = comment.user_id if hasattr(comment, 'user_id') else None
+        current_user_id = comment.user_id
         notify_user_id = None
         
         if current_user_id == feedback.manager_id:
@@ -89,7 +92,8 @@ def notify_new_comment(db: Session, comment: models.FeedbackComment, feedback: m
                 user_id=notify_user_id,
                 message=f"{sender} commented on feedback",
                 read=False,
-                related_feedback_id=feedback.id
+                related_feedback_id=feedback.id,
+                organization_id=feedback.organization_id
             )
             db.add(notification)
             db.commit()
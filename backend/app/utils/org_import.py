@@ -0,0 +1,230 @@
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .cache import dashboard_cache
+from .reporting import reporting_index
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "200000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Initial passwords are hashed with fewer bcrypt rounds; auth upgrades them on first login
+IMPORT_BCRYPT_ROUNDS = int(os.getenv("IMPORT_BCRYPT_ROUNDS", "10"))
+HASH_CHUNK_SIZE = 64
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_rows(lines: Iterable[str], format: str) -> Iterator[tuple]:
+    """(line number, raw dict or error message) for each record of a CSV (with header) or NDJSON stream"""
+    if format == schemas.ImportFormat.CSV:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {key.strip(): (value or "").strip() for key, value in record.items() if key}
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield number, "Invalid JSON"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+def _validation_errors(exc: ValidationError) -> list:
+    return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+
+def _hash_chunk(passwords, rounds):
+    # Runs in pool workers
+    from passlib.hash import bcrypt
+    hasher = bcrypt.using(rounds=rounds)
+    return [hasher.hash(password) for password in passwords]
+
+def _hash_passwords(passwords: list, workers: int, rounds: int) -> list:
+    chunks = [passwords[i:i + HASH_CHUNK_SIZE] for i in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 1:
+        return [hashed for chunk in chunks for hashed in _hash_chunk(chunk, rounds)]
+    # spawn, not fork: this is called from a server thread, and forking a threaded process is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return [hashed for result in pool.map(_hash_chunk, chunks, [rounds] * len(chunks)) for hashed in result]
+
+def _existing_users(db: Session, emails: list) -> dict:
+    """email -> (id, role, organization_id) for the given emails that already exist"""
+    found = {}
+    for start in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        for user_id, email, role, organization_id in db.query(
+            models.User.id, models.User.email, models.User.role, models.User.organization_id
+        ).filter(models.User.email.in_(emails[start:start + LOOKUP_CHUNK_SIZE])):
+            found[email] = (user_id, role, organization_id)
+    return found
+
+def import_users(db: Session, records: Iterable[tuple], organization_id: Optional[int] = None,
+                 dry_run: bool = False, workers: int = IMPORT_HASH_WORKERS,
+                 rounds: int = IMPORT_BCRYPT_ROUNDS) -> Iterator[dict]:
+    """
+    Create users and reporting lines from ``records`` ((line number, dict) as
+    from parse_rows) in ``organization_id``.
+
+    Rows are validated in memory: field validation, emails repeated in the
+    file or already registered, managers that are neither a row of the
+    import nor an existing manager of the organization, managers that aren't
+    managers, and reporting cycles. A row whose manager row failed fails too.
+    Managers may appear after their reports. Passwords of the valid rows are
+    hashed across ``workers`` processes, then every valid row is inserted in
+    batches of IMPORT_BATCH_SIZE in one transaction, and reporting lines are
+    set with one batched UPDATE. Nothing is written with ``dry_run``.
+
+    Yields one ``{"line", "email", "errors"}`` dict per rejected row, then a
+    ``{"summary": ...}`` dict.
+    """
+    started = time.perf_counter()
+    rows = {}    # email -> (line, UserImportRow)
+    failed = {}  # line -> {"line", "email", "errors"}
+    total = 0
+
+    for line, record in records:
+        total += 1
+        if total > IMPORT_MAX_ROWS:
+            yield {"summary": {"rows": total, "created": 0, "failed": total, "dry_run": dry_run,
+                               "error": f"More than {IMPORT_MAX_ROWS} rows; split the file"}}
+            return
+        if isinstance(record, str):
+            failed[line] = {"line": line, "email": None, "errors": [record]}
+            continue
+        try:
+            row = schemas.UserImportRow(**{key: (value if value != "" else None) for key, value in record.items()})
+        except ValidationError as exc:
+            failed[line] = {"line": line, "email": record.get("email"), "errors": _validation_errors(exc)}
+            continue
+        if row.email in rows:
+            failed[line] = {"line": line, "email": row.email,
+                            "errors": [f"Duplicate email (also on line {rows[row.email][0]})"]}
+            continue
+        rows[row.email] = (line, row)
+
+    # One pass over the database for every email the file mentions
+    mentioned = set(rows) | {row.manager_email for _, row in rows.values() if row.manager_email}
+    existing = _existing_users(db, sorted(mentioned))
+
+    rejected = {entry["email"] for entry in failed.values() if entry["email"]}
+
+    def reject(email, error):
+        line, _ = rows.pop(email)
+        failed[line] = {"line": line, "email": email, "errors": [error]}
+        rejected.add(email)
+
+    for email in [email for email in rows if email in existing]:
+        reject(email, "Email already registered")
+    # Managers outside the file must be existing managers of the same organization;
+    # reports of rejected rows are rejected by the chain walk below
+    for email, (_, row) in list(rows.items()):
+        manager = row.manager_email
+        if manager is None or manager in rows or (manager in rejected and manager not in existing):
+            continue
+        if manager not in existing:
+            reject(email, f"Manager {manager} not found")
+        elif existing[manager][2] != organization_id:
+            reject(email, f"Manager {manager} belongs to a different organization")
+        elif existing[manager][1] != models.UserRole.MANAGER:
+            reject(email, f"{manager} is not a manager")
+    for email, (_, row) in list(rows.items()):
+        manager = rows.get(row.manager_email)
+        if manager is not None and manager[1].role != schemas.UserRole.MANAGER:
+            reject(email, f"{row.manager_email} is not a manager")
+
+    # Walk each reporting chain up once: rows under a rejected manager are rejected, cycles as a whole
+    state = {}  # email -> whether its chain reaches the top (no manager, or an existing one)
+    for start in list(rows):
+        if start not in rows or start in state:
+            continue
+        chain = []
+        email = start
+        while email in rows and email not in state and email not in chain:
+            chain.append(email)
+            email = rows[email][1].manager_email
+        if email in chain:
+            cycle = chain[chain.index(email):]
+            for member in cycle:
+                state[member] = False
+                reject(member, "Reporting cycle: " + " -> ".join(cycle + [email]))
+            chain = chain[:chain.index(email)]
+            ok = False
+        elif email in state:
+            ok = state[email]
+        else:
+            ok = email is None or email in existing
+        for member in reversed(chain):
+            state[member] = ok
+            if not ok:
+                reject(member, f"Manager {rows[member][1].manager_email} was rejected")
+
+    for entry in sorted(failed.values(), key=lambda entry: entry["line"]):
+        yield entry
+
+    created = 0
+    if rows and not dry_run:
+        valid = [row for _, row in sorted(rows.values(), key=lambda item: item[0])]
+        hashes = _hash_passwords([row.password for row in valid], workers, rounds)
+        try:
+            created = _insert(db, valid, hashes, organization_id, existing)
+        except IntegrityError:
+            db.rollback()
+            yield {"summary": {"rows": total, "created": 0, "failed": total, "dry_run": dry_run,
+                               "error": "Some emails were registered while importing; nothing was imported"}}
+            return
+    yield {"summary": {
+        "rows": total,
+        "created": created,
+        "valid": len(rows),
+        "failed": len(failed),
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 2),
+    }}
+
+def _insert(db: Session, valid: list, hashes: list, organization_id: Optional[int], existing: dict) -> int:
+    """Insert the rows, then set their managers; one transaction"""
+    ids = {email: entry[0] for email, entry in existing.items()}
+    for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+        batch = valid[start:start + IMPORT_BATCH_SIZE]
+        result = db.execute(
+            insert(models.User).returning(models.User.id, models.User.email),
+            [
+                {
+                    "email": row.email,
+                    "full_name": row.full_name,
+                    "hashed_password": hashed,
+                    "role": models.UserRole(row.role.value),
+                    "is_active": True,
+                    "organization_id": organization_id,
+                }
+                for row, hashed in zip(batch, hashes[start:start + IMPORT_BATCH_SIZE])
+            ],
+        )
+        ids.update({email: user_id for user_id, email in result})
+
+    lines = [
+        {"user_id": ids[row.email], "new_manager_id": ids[row.manager_email]}
+        for row in valid if row.manager_email
+    ]
+    table = models.User.__table__
+    for start in range(0, len(lines), IMPORT_BATCH_SIZE):
+        db.execute(
+            update(table).where(table.c.id == bindparam("user_id")).values(manager_id=bindparam("new_manager_id")),
+            lines[start:start + IMPORT_BATCH_SIZE],
+        )
+    db.commit()
+
+    # Existing managers who gained reports: their cached report sets and dashboards are stale
+    managers = {line["new_manager_id"] for line in lines}
+    reporting_index.invalidate_manager(*managers)
+    dashboard_cache.invalidate_user(*managers)
+    return len(valid)
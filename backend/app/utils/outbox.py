@@ -0,0 +1,28 @@
+from typing import Optional
+
+import orjson
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from .. import models
+
+def _snapshot(entity) -> dict:
+    return {attr.key: getattr(entity, attr.key) for attr in inspect(entity).mapper.column_attrs}
+
+def record_change(db: Session, entity_type: str, entity, operation: str,
+                  manager_id: Optional[int], employee_id: Optional[int]):
+    """
+    Add a ChangeEvent for ``entity`` to the current transaction.
+
+    Call before ``db.commit()`` so the event is committed atomically with the
+    change itself; the pending objects are flushed first to get their ids.
+    """
+    db.flush()
+    db.add(models.ChangeEvent(
+        entity_type=entity_type,
+        entity_id=entity.id,
+        operation=operation,
+        manager_id=manager_id,
+        employee_id=employee_id,
+        payload=orjson.dumps(_snapshot(entity), default=str).decode(),
+    ))
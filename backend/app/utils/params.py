@@ -0,0 +1,37 @@
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+
+# Upper bound on ids accepted by the batch endpoints
+MAX_BATCH_IDS = 200
+
+def parse_ids(ids: str = Query(..., description="Comma-separated ids, e.g. ids=1,2,3")) -> List[int]:
+    """Dependency parsing ``?ids=1,2,3`` into a de-duplicated list of ints"""
+    try:
+        parsed = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="At least one id is required")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return parsed
+
+def field_selector(allowed: Sequence[str]):
+    """
+    Build a dependency for a sparse-fieldset ``?fields=a,b`` parameter.
+
+    Returns None when the parameter is absent, otherwise the requested fields
+    (always including ``id``) in request order. Unknown names are a 400.
+    """
+    def parse_fields(
+        fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(allowed)}")
+    ) -> Optional[Tuple[str, ...]]:
+        if fields is None:
+            return None
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(["id"] + requested))
+    return parse_fields
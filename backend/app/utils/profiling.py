@@ -0,0 +1,294 @@
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+# Off by default: when off, main.py installs neither the middleware nor the hooks
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+# Requests from an admin (users.is_admin, see scripts/grant_admin.py) carrying this header are profiled
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile").lower().encode("latin-1")
+# Comma-separated path regexes profiled without the header, e.g. PROFILE_ROUTES=^/api/dashboard/
+PROFILE_ROUTES = [re.compile(pattern.strip()) for pattern in os.getenv("PROFILE_ROUTES", "").split(",") if pattern.strip()]
+# Fraction of the requests to PROFILE_ROUTES that are profiled
+PROFILE_ROUTE_SAMPLE_RATE = float(os.getenv("PROFILE_ROUTE_SAMPLE_RATE", "1"))
+PROFILING_REPORT_DIR = os.getenv("PROFILING_REPORT_DIR", "./profiles")
+PROFILING_MAX_REPORTS = int(os.getenv("PROFILING_MAX_REPORTS", "200"))
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_MAX_STATEMENTS = 500
+
+_current = ContextVar("request_profile", default=None)
+
+class RequestProfile:
+    """The function profile and SQL statements of one request"""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.status = None
+        self.profiler = cProfile.Profile()
+        self.profiled = False
+        self.statements = []  # (sql, seconds)
+        self._lock = threading.Lock()
+
+    def add_statement(self, statement: str, seconds: float):
+        with self._lock:
+            self.statements.append((statement, seconds))
+
+    def finish(self, status: int):
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started
+            self.status = status
+
+    def sql_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def server_timing(self) -> str:
+        return (
+            f'app;dur={self.elapsed * 1000:.1f}, '
+            f'db;dur={self.sql_seconds() * 1000:.1f};desc="{len(self.statements)} queries"'
+        )
+
+    def report(self) -> dict:
+        repeated = defaultdict(lambda: [0, 0.0])
+        for statement, seconds in self.statements:
+            repeated[statement][0] += 1
+            repeated[statement][1] += seconds
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "total_ms": round(self.elapsed * 1000, 2),
+            "sql": {
+                "count": len(self.statements),
+                "total_ms": round(self.sql_seconds() * 1000, 2),
+                # Same statement run many times: usually a query per row
+                "repeated": sorted(
+                    ({"sql": statement, "count": count, "total_ms": round(seconds * 1000, 2)}
+                     for statement, (count, seconds) in repeated.items() if count > 1),
+                    key=lambda entry: -entry["total_ms"],
+                ),
+                "statements": [
+                    {"sql": statement, "ms": round(seconds * 1000, 3)}
+                    for statement, seconds in self.statements[:PROFILE_MAX_STATEMENTS]
+                ],
+            },
+            "functions": self._functions() if self.profiled else [],
+        }
+
+    def _functions(self) -> List[dict]:
+        """Functions by cumulative time, as in ``pstats`` sorted by cumulative"""
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{name} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "own_ms": round(tottime * 1000, 3),
+                "cumulative_ms": round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda row: -row["cumulative_ms"])
+        return rows[:PROFILE_TOP_FUNCTIONS]
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages/", "backend/"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.get("profile_query_started")
+    if profile is not None and started:
+        profile.add_statement(statement, time.perf_counter() - started.pop())
+
+def _profiled_call(call):
+    """Run an endpoint under the request's profiler, in the thread that executes it"""
+    if inspect.iscoroutinefunction(call):
+        # Coroutines share the event loop thread, so the profile may include other requests' work
+        @functools.wraps(call)
+        async def profiled(*args, **kwargs):
+            profile = _current.get()
+            if profile is None or not _enable(profile):
+                return await call(*args, **kwargs)
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profile.profiler.disable()
+    else:
+        @functools.wraps(call)
+        def profiled(*args, **kwargs):
+            profile = _current.get()
+            if profile is None or not _enable(profile):
+                return call(*args, **kwargs)
+            try:
+                return call(*args, **kwargs)
+            finally:
+                profile.profiler.disable()
+    return profiled
+
+def _enable(profile: RequestProfile) -> bool:
+    try:
+        profile.profiler.enable()
+    except ValueError:
+        # Another profiler is active in this thread (or process, on Python 3.12+); keep the SQL timings
+        return False
+    profile.profiled = True
+    return True
+
+def instrument(app):
+    """
+    Hook the routes of ``app`` and every SQLAlchemy engine for profiling.
+    Call once, after the routers are included. Nothing is recorded unless a
+    request is being profiled by ProfilingMiddleware.
+    """
+    from fastapi.routing import APIRoute
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            # FastAPI decided at registration whether to await the call; the wrapper keeps its kind
+            route.dependant.call = _profiled_call(route.dependant.call)
+
+def _is_admin_request(scope) -> bool:
+    """Whether the bearer token is valid (not expired or revoked) and belongs to an active admin"""
+    from fastapi import HTTPException
+    from .. import auth
+    from ..database import SessionLocal
+
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            db = SessionLocal()
+            try:
+                user = auth.authenticate_token(db, token)
+                return bool(user.is_active and user.is_admin)
+            except HTTPException:
+                return False
+            finally:
+                db.close()
+    return False
+
+class ProfilingMiddleware:
+    """
+    Profile a request when an admin sends the ``X-Profile`` header, or when
+    its path matches PROFILE_ROUTES. The endpoint runs under cProfile and
+    every SQL statement is timed. The response gets a ``Server-Timing``
+    header and an ``X-Profile-Id``. The report is written to
+    PROFILING_REPORT_DIR and served by the admin routes in
+    routers/profiling.py. Timings stop when the response starts; statements
+    run while a streamed body is sent are still listed.
+    """
+
+    def __init__(self, app, routes=PROFILE_ROUTES, sample_rate: float = PROFILE_ROUTE_SAMPLE_RATE):
+        self.app = app
+        self.routes = routes
+        self.sample_rate = sample_rate
+
+    async def _trigger(self, scope) -> Optional[str]:
+        # Checking the token may query the database, so it runs in the threadpool
+        if any(name == PROFILE_HEADER for name, _ in scope.get("headers", [])) and \
+                await run_in_threadpool(_is_admin_request, scope):
+            return "header"
+        if any(route.search(scope["path"]) for route in self.routes) and random.random() < self.sample_rate:
+            return "route"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = await self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger)
+        token = _current.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                profile.finish(message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            profile.finish(500)
+            await run_in_threadpool(store_report, profile.report())
+
+def _report_path(report_id: str) -> str:
+    return os.path.join(PROFILING_REPORT_DIR, f"{report_id}.json")
+
+def store_report(report: dict):
+    try:
+        os.makedirs(PROFILING_REPORT_DIR, exist_ok=True)
+        with open(_report_path(report["id"]), "wb") as report_file:
+            report_file.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        reports = sorted(
+            (entry for entry in os.scandir(PROFILING_REPORT_DIR) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in reports[:max(0, len(reports) - PROFILING_MAX_REPORTS)]:
+            os.remove(entry.path)
+        print(f"Profiled {report['method']} {report['path']}: {report['total_ms']}ms, "
+              f"{report['sql']['count']} queries ({report['sql']['total_ms']}ms), report {report['id']}")
+    except OSError as exc:
+        print(f"Could not store profile {report['id']}: {exc}")
+
+def list_reports(limit: int = 50) -> List[dict]:
+    """The newest stored reports, without their statements and functions"""
+    if not os.path.isdir(PROFILING_REPORT_DIR):
+        return []
+    entries = sorted(
+        (entry for entry in os.scandir(PROFILING_REPORT_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )[:limit]
+    summaries = []
+    for entry in entries:
+        report = read_report(entry.name[:-len(".json")])
+        if report is not None:
+            summary = {key: report[key] for key in ("id", "method", "path", "status", "trigger", "started_at", "total_ms")}
+            summary.update(sql_count=report["sql"]["count"], sql_ms=report["sql"]["total_ms"])
+            summaries.append(summary)
+    return summaries
+
+def read_report(report_id: str) -> Optional[dict]:
+    if not re.fullmatch(r"[0-9a-f]{16}", report_id):
+        return None
+    try:
+        with open(_report_path(report_id), "rb") as report_file:
+            return orjson.loads(report_file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
@@ -0,0 +1,313 @@
+import abc
+import asyncio
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" (per worker) or "sqlite:///path/to/file.db" to share buckets between the workers on a host
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Per worker: requests running at once, and requests allowed to wait for a slot
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "40"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "100"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "5"))
+LOAD_SHED_RETRY_AFTER = int(os.getenv("LOAD_SHED_RETRY_AFTER", "2"))
+
+# Never limited or shed: the orchestrator must always be able to reach these
+EXEMPT_PATHS = ("/", "/ping", "/healthz", "/readyz")
+
+class Limit(NamedTuple):
+    """A token bucket: ``burst`` requests at once, refilled at ``burst`` per ``period`` seconds"""
+    burst: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.burst / self.period
+
+def parse_limit(value: str) -> Optional[Limit]:
+    """"10/60" -> Limit(10, 60.0); "" or "0" -> None (no limit)"""
+    value = value.strip()
+    if not value or value == "0":
+        return None
+    count, _, period = value.partition("/")
+    return Limit(int(count), float(period or 1))
+
+class RouteGroup(NamedTuple):
+    name: str
+    pattern: "re.Pattern"
+    methods: Optional[tuple]  # None = any method
+    per_user: Optional[Limit]
+    per_ip: Optional[Limit]
+
+def _group(name, pattern, methods, per_user, per_ip):
+    # RATE_LIMIT_<NAME>_USER / RATE_LIMIT_<NAME>_IP override the defaults, e.g. RATE_LIMIT_LOGIN_IP=5/60
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return RouteGroup(
+        name, re.compile(pattern), methods,
+        parse_limit(os.getenv(f"{prefix}_USER", per_user)), parse_limit(os.getenv(f"{prefix}_IP", per_ip)),
+    )
+
+# First match wins
+ROUTE_GROUPS = (
+    # Every login is a bcrypt verify
+    _group("login", r"^/token(/refresh)?$", ("POST",), "", "10/60"),
+    # Endpoints clients poll
+    _group("polling", r"^/api/(notifications/|changes|timeline)", ("GET",), "60/60", "300/60"),
+    _group("export", r"^/api/feedback/export$", ("GET",), "5/60", "20/60"),
+    _group("write", r"^/api/", ("POST", "PUT", "PATCH", "DELETE"), "60/60", "300/60"),
+    _group("api", r"^/api/", None, "300/60", "1200/60"),
+)
+
+class CounterStore(abc.ABC):
+    """
+    Where token buckets live. ``take`` removes one token from the bucket at
+    ``key`` and returns 0 if the request may go ahead, otherwise the seconds
+    until a token is available. Stores with ``blocking = True`` are called
+    from the threadpool.
+    """
+    blocking = False
+
+    @abc.abstractmethod
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        ...
+
+    @staticmethod
+    def _refill(tokens: float, updated: float, limit: Limit, now: float):
+        """(tokens after taking one, seconds to wait) for a bucket last at ``tokens`` at ``updated``"""
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / limit.rate
+
+class MemoryCounterStore(CounterStore):
+    """Buckets in this process; each worker enforces the limits on its own share of the traffic"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens, wait = self._refill(tokens, updated, limit, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+        return wait
+
+    def _evict(self, now: float):
+        # Buckets idle for an hour are full again under any configured limit; forgetting them changes nothing
+        idle = [key for key, (_, updated) in self._buckets.items() if now - updated > 3600]
+        for key in idle or list(self._buckets)[: len(self._buckets) // 2]:
+            del self._buckets[key]
+
+class SqliteCounterStore(CounterStore):
+    """
+    Buckets in a SQLite file shared by the workers on one host.
+
+    Each ``take`` is one short write transaction. A store that can't be
+    reached lets the request through rather than failing it. This is also
+    the reference for a networked store (e.g. Redis with a script doing the
+    same read-refill-write atomically).
+    """
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, limit: Limit, now: float) -> float:
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, wait = self._refill(*(row or (limit.burst, now)), limit, now)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            return wait
+        except sqlite3.Error as exc:
+            print(f"Rate limit store unavailable, allowing request: {exc}")
+            return 0.0
+
+def counter_store_from_url(url: str) -> CounterStore:
+    if url.startswith("sqlite:///"):
+        return SqliteCounterStore(url[len("sqlite:///"):])
+    return MemoryCounterStore()
+
+def _client_ip(scope) -> Optional[str]:
+    client = scope.get("client")
+    return client[0] if client else None
+
+def _token_subject(scope) -> Optional[str]:
+    """Subject of a valid bearer token (cached signature check), None otherwise"""
+    from jose import JWTError
+    from .. import auth
+
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return auth.decode_token(token).get("sub")
+            except JWTError:
+                return None
+    return None
+
+class RateLimitMiddleware:
+    """
+    Per-user and per-IP token buckets for the route groups in ROUTE_GROUPS.
+
+    A request is checked against its group's per-IP bucket and, with a valid
+    bearer token, its per-user bucket; when either is empty it gets 429 with
+    ``Retry-After``. Unauthenticated requests are limited by IP only.
+    """
+
+    def __init__(self, app, store: CounterStore = None, groups=ROUTE_GROUPS, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.store = store or counter_store_from_url(RATE_LIMIT_STORE)
+        self.groups = groups
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        group = self._group_for(scope["method"], scope["path"])
+        wait = 0.0
+        if group is not None:
+            now = time.time()
+            checks = []
+            if group.per_ip:
+                checks.append((f"{group.name}:ip:{_client_ip(scope)}", group.per_ip))
+            subject = _token_subject(scope) if group.per_user else None
+            if subject:
+                checks.append((f"{group.name}:user:{subject}", group.per_user))
+            for key, limit in checks:
+                if self.store.blocking:
+                    wait = max(wait, await run_in_threadpool(self.store.take, key, limit, now))
+                else:
+                    wait = max(wait, self.store.take(key, limit, now))
+
+        if wait > 0:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"}, status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    def _group_for(self, method: str, path: str) -> Optional[RouteGroup]:
+        for group in self.groups:
+            if (group.methods is None or method in group.methods) and group.pattern.match(path):
+                return group
+        return None
+
+class ConcurrencyLimitMiddleware:
+    """
+    Load shedding: at most ``max_concurrent`` requests run at once in this
+    worker and up to ``max_queued`` more wait for a slot. Anything beyond
+    that, or waiting longer than ``queue_timeout`` seconds, gets 503 with
+    ``Retry-After`` straight away instead of piling up on the threadpool and
+    the database pool.
+    """
+
+    def __init__(self, app, max_concurrent: int = MAX_CONCURRENT_REQUESTS, max_queued: int = MAX_QUEUED_REQUESTS,
+                 queue_timeout: float = QUEUE_TIMEOUT_SECONDS, retry_after: int = LOAD_SHED_RETRY_AFTER):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+        self._semaphore = None
+        global _concurrency_limiter
+        _concurrency_limiter = self
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "shed_total": self.shed,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if self._semaphore is None:
+            # Created lazily so it belongs to the worker's event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            await self._reject(scope, receive, send)
+            return
+        if self._semaphore.locked():
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self._reject(scope, receive, send)
+                return
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _reject(self, scope, receive, send):
+        self.shed += 1
+        response = JSONResponse(
+            {"detail": "Server busy, retry later"}, status_code=503,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+        await response(scope, receive, send)
+
+_concurrency_limiter = None
+
+def load_stats() -> Optional[dict]:
+    """In-flight and queued request counts of this worker's ConcurrencyLimitMiddleware"""
+    return _concurrency_limiter.stats() if _concurrency_limiter is not None else None
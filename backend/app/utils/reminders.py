@@ -0,0 +1,127 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from .. import models
+
+REMINDER_REQUEST_AGE_DAYS = float(os.getenv("REMINDER_REQUEST_AGE_DAYS", "7"))
+REMINDER_FEEDBACK_AGE_DAYS = float(os.getenv("REMINDER_FEEDBACK_AGE_DAYS", "3"))
+REMINDER_THROTTLE_HOURS = float(os.getenv("REMINDER_THROTTLE_HOURS", "24"))
+REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", "1000"))
+
+STALE_REQUESTS = "stale_requests"
+UNACKNOWLEDGED_FEEDBACK = "unacknowledged_feedback"
+
+def _stale_request_groups(db: Session, cutoff: datetime, after_user_id: int, chunk_size: int):
+    """(manager_id, pending count, oldest request id) for the next chunk of managers"""
+    return db.query(
+        models.User.manager_id,
+        func.count(models.FeedbackRequest.id),
+        func.min(models.FeedbackRequest.id),
+    ).join(
+        models.User, models.FeedbackRequest.employee_id == models.User.id
+    ).filter(
+        models.FeedbackRequest.status == models.FeedbackRequestStatus.PENDING,
+        models.FeedbackRequest.created_at < cutoff,
+        models.User.manager_id > after_user_id
+    ).group_by(models.User.manager_id).order_by(models.User.manager_id).limit(chunk_size).all()
+
+def _unacknowledged_feedback_groups(db: Session, cutoff: datetime, after_user_id: int, chunk_size: int):
+    """(employee_id, unacknowledged count, oldest feedback id) for the next chunk of employees"""
+    return db.query(
+        models.Feedback.employee_id,
+        func.count(models.Feedback.id),
+        func.min(models.Feedback.id),
+    ).filter(
+        models.Feedback.is_acknowledged == False,  # noqa: E712
+        models.Feedback.created_at < cutoff,
+        models.Feedback.employee_id > after_user_id
+    ).group_by(models.Feedback.employee_id).order_by(models.Feedback.employee_id).limit(chunk_size).all()
+
+def _recently_reminded(db: Session, kind: str, user_ids, since: datetime) -> set:
+    rows = db.query(models.ReminderLog.user_id).filter(
+        models.ReminderLog.kind == kind,
+        models.ReminderLog.user_id.in_(user_ids),
+        models.ReminderLog.last_sent_at >= since
+    ).all()
+    return {row[0] for row in rows}
+
+def _send_chunk(db: Session, kind: str, groups, now: datetime, throttle_since: datetime) -> int:
+    throttled = _recently_reminded(db, kind, [group[0] for group in groups], throttle_since)
+    to_notify = [group for group in groups if group[0] not in throttled]
+    if not to_notify:
+        return 0
+
+    if kind == STALE_REQUESTS:
+        notifications = [
+            {
+                "user_id": user_id,
+                "message": f"Reminder: {count} feedback request(s) from your team are still waiting",
+                "read": False,
+                "related_request_id": oldest_id,
+                "created_at": now,
+            }
+            for user_id, count, oldest_id in to_notify
+        ]
+    else:
+        notifications = [
+            {
+                "user_id": user_id,
+                "message": f"Reminder: you have {count} feedback item(s) to acknowledge",
+                "read": False,
+                "related_feedback_id": oldest_id,
+                "created_at": now,
+            }
+            for user_id, count, oldest_id in to_notify
+        ]
+
+    user_ids = [group[0] for group in to_notify]
+    organizations = dict(db.query(models.User.id, models.User.organization_id).filter(models.User.id.in_(user_ids)).all())
+    for notification in notifications:
+        notification["organization_id"] = organizations.get(notification["user_id"])
+    # One executemany for the notifications, and the throttle log replaced in bulk
+    db.execute(insert(models.Notification), notifications)
+    db.query(models.ReminderLog).filter(
+        models.ReminderLog.kind == kind,
+        models.ReminderLog.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+    db.execute(insert(models.ReminderLog), [
+        {"user_id": user_id, "kind": kind, "last_sent_at": now} for user_id in user_ids
+    ])
+    db.commit()
+    return len(to_notify)
+
+def send_reminders(db: Session, chunk_size: int = REMINDER_CHUNK_SIZE, pause_seconds: float = 0.0) -> dict:
+    """
+    Remind managers about stale pending requests and employees about
+    unacknowledged feedback.
+
+    Candidates are found with grouped queries, one reminder per user per kind,
+    skipping users reminded within REMINDER_THROTTLE_HOURS. Users are processed
+    in keyset chunks of ``chunk_size`` with a commit per chunk, optionally
+    pausing between chunks to leave room for API traffic.
+    """
+    now = datetime.utcnow()
+    throttle_since = now - timedelta(hours=REMINDER_THROTTLE_HOURS)
+    jobs = (
+        (STALE_REQUESTS, _stale_request_groups, now - timedelta(days=REMINDER_REQUEST_AGE_DAYS)),
+        (UNACKNOWLEDGED_FEEDBACK, _unacknowledged_feedback_groups, now - timedelta(days=REMINDER_FEEDBACK_AGE_DAYS)),
+    )
+
+    sent = {}
+    for kind, find_groups, cutoff in jobs:
+        sent[kind] = 0
+        after_user_id = 0
+        while True:
+            groups = find_groups(db, cutoff, after_user_id, chunk_size)
+            if not groups:
+                break
+            sent[kind] += _send_chunk(db, kind, groups, now, throttle_since)
+            after_user_id = groups[-1][0]
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        print(f"Reminders: sent {sent[kind]} {kind} reminder(s)")
+    return sent
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from .. import models
+
+class ReportingLineIndex:
+    """
+    In-memory index of who may see whom, used by the authorization checks.
+
+    Keeps manager id -> direct report ids and employee id -> ids of users who
+    gave them feedback. Each set is loaded with one query the first time it is
+    needed and updated in place by the write paths in this process. A miss
+    reloads the set before denying, so changes made by other workers are
+    picked up without waiting for ``ttl_seconds`` to expire.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._reports = {}          # manager_id -> (set of employee ids, loaded_at)
+        self._feedback_givers = {}  # employee_id -> (set of giver ids, loaded_at)
+        self._lock = threading.Lock()
+
+    def is_report(self, db: Session, manager_id: int, employee_id: int) -> bool:
+        """True if ``employee_id`` reports directly to ``manager_id``"""
+        return self._contains(self._reports, manager_id, employee_id, lambda: self._load_reports(db, manager_id))
+
+    def reports_of(self, db: Session, manager_id: int, refresh: bool = False) -> set:
+        load = lambda: self._load_reports(db, manager_id)
+        if refresh:
+            self._store(self._reports, manager_id, load())
+        return set(self._get(self._reports, manager_id, load))
+
+    def feedback_givers_of(self, db: Session, employee_id: int, refresh: bool = False) -> set:
+        load = lambda: self._load_feedback_givers(db, employee_id)
+        if refresh:
+            self._store(self._feedback_givers, employee_id, load())
+        return set(self._get(self._feedback_givers, employee_id, load))
+
+    def gave_feedback(self, db: Session, giver_id: int, employee_id: int) -> bool:
+        """True if ``giver_id`` has given feedback to ``employee_id``"""
+        return self._contains(
+            self._feedback_givers, employee_id, giver_id, lambda: self._load_feedback_givers(db, employee_id)
+        )
+
+    def add_report(self, manager_id: int, employee_id: int):
+        with self._lock:
+            entry = self._reports.get(manager_id)
+            if entry:
+                entry[0].add(employee_id)
+
+    def record_feedback(self, giver_id: int, employee_id: int):
+        with self._lock:
+            entry = self._feedback_givers.get(employee_id)
+            if entry:
+                entry[0].add(giver_id)
+
+    def invalidate_manager(self, *manager_ids: int):
+        """Forget cached reports, e.g. after an employee's manager_id changes"""
+        with self._lock:
+            for manager_id in manager_ids:
+                self._reports.pop(manager_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+            self._feedback_givers.clear()
+
+    def _contains(self, table, key, member, load):
+        with self._lock:
+            entry = table.get(key)
+        if entry and time.monotonic() - entry[1] < self.ttl_seconds and member in entry[0]:
+            return True
+        # Not loaded, expired, or a possibly stale miss: check the database before denying
+        ids = load()
+        self._store(table, key, ids)
+        return member in ids
+
+    def _get(self, table, key, load):
+        with self._lock:
+            entry = table.get(key)
+        if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+        ids = load()
+        self._store(table, key, ids)
+        return ids
+
+    def _store(self, table, key, ids):
+        with self._lock:
+            table[key] = (ids, time.monotonic())
+
+    @staticmethod
+    def _load_reports(db: Session, manager_id: int) -> set:
+        rows = db.query(models.User.id).filter(models.User.manager_id == manager_id).all()
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def _load_feedback_givers(db: Session, employee_id: int) -> set:
+        # Archived feedback still counts: the employee can keep reading it
+        rows = db.query(models.Feedback.manager_id).filter(
+            models.Feedback.employee_id == employee_id
+        ).union(
+            db.query(models.ArchivedFeedback.manager_id).filter(models.ArchivedFeedback.employee_id == employee_id)
+        ).all()
+        return {row[0] for row in rows}
+
+reporting_index = ReportingLineIndex(ttl_seconds=float(os.getenv("REPORTING_INDEX_TTL_SECONDS", "300")))
@@ -0,0 +1,177 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATABASE_URL, SessionLocal
+
+# How often each worker picks up revocations made by other workers
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# How often expired entries are purged and the filter is rebuilt
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+# Ids are assigned when a revocation is written, not when it commits: on a database with
+# concurrent writers a lower id can become visible after a higher one was synced. The sync
+# cursor only moves past entries this old, so later ones are read again until they settle.
+# SQLite serializes writers, so ids there become visible in order.
+REVOCATION_SETTLE_SECONDS = float(os.getenv(
+    "REVOCATION_SETTLE_SECONDS", "0" if DATABASE_URL.startswith("sqlite") else "5"
+))
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+
+def token_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+class BloomFilter:
+    """Set membership with no false negatives and ``error_rate`` false positives at ``capacity`` keys"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationList:
+    """
+    Revoked tokens, checked in memory.
+
+    Every entry in the ``revoked_tokens`` table is a key in a per-process
+    Bloom filter: a single token (``jti:<id>``) or every token a user was
+    issued up to a moment (``user:<id>``, for logout everywhere and
+    deactivation). A token whose keys are not in the filter is certainly not
+    revoked, so the common path needs no query; a hit is confirmed against
+    the table. Revocations made in this process are added to the filter at
+    once, those from other workers are picked up by an incremental sync every
+    ``sync_seconds``. The sync resumes after the last entry older than
+    ``settle_seconds``, so an entry that commits within that time of being
+    written is picked up even if a higher id was read first. Expired entries
+    are purged and the filter rebuilt every ``rebuild_seconds``.
+    """
+
+    def __init__(self, sync_seconds: float, rebuild_seconds: float, capacity: int, error_rate: float,
+                 settle_seconds: float = REVOCATION_SETTLE_SECONDS):
+        self.sync_seconds = sync_seconds
+        self.settle_seconds = settle_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._unsettled_ids = set()  # ids above _last_id already in the filter
+        self._synced_at = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, db: Session, jti: Optional[str], user_id: int, issued_at: float) -> bool:
+        self._sync()
+        candidates = [key for key in ((token_key(jti) if jti else None), user_key(user_id)) if key and key in self._filter]
+        if not candidates:
+            return False
+        # Possible false positive: confirm with the table
+        entries = db.query(models.RevokedToken.key, func.max(models.RevokedToken.revoked_before)).filter(
+            models.RevokedToken.key.in_(candidates)
+        ).group_by(models.RevokedToken.key).all()
+        for key, revoked_before in entries:
+            if key.startswith("jti:") or (revoked_before is not None and issued_at < revoked_before):
+                return True
+        return False
+
+    def revoke_token(self, db: Session, jti: str, expires_at: datetime):
+        """Revoke one token until it would have expired anyway"""
+        self._revoke(db, token_key(jti), expires_at, None)
+
+    def revoke_user(self, db: Session, user_id: int, valid_for: timedelta):
+        """Revoke every token issued to the user so far; ``valid_for`` is the longest token lifetime"""
+        self._revoke(db, user_key(user_id), datetime.utcnow() + valid_for, time.time())
+
+    def _revoke(self, db: Session, key: str, expires_at: datetime, revoked_before: Optional[float]):
+        db.add(models.RevokedToken(key=key, expires_at=expires_at, revoked_before=revoked_before))
+        db.commit()
+        with self._lock:
+            self._filter.add(key)
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+            return
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+                return
+            # Its own session: the request's session may be bound to a tenant database
+            db = SessionLocal()
+            try:
+                if self._built_at is None or now - self._built_at >= self.rebuild_seconds:
+                    self._rebuild(db)
+                    self._built_at = now
+                else:
+                    rows = db.query(
+                        models.RevokedToken.id, models.RevokedToken.key, models.RevokedToken.created_at
+                    ).filter(
+                        models.RevokedToken.id > self._last_id
+                    ).order_by(models.RevokedToken.id).all()
+                    for row_id, key, _ in rows:
+                        if row_id not in self._unsettled_ids:
+                            self._filter.add(key)
+                    self._advance(rows)
+            finally:
+                db.close()
+            self._synced_at = now
+
+    def _rebuild(self, db: Session):
+        db.query(models.RevokedToken).filter(
+            models.RevokedToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        rows = db.query(
+            models.RevokedToken.id, models.RevokedToken.key, models.RevokedToken.created_at
+        ).order_by(models.RevokedToken.id).all()
+        # Keep the false positive rate near error_rate as the list grows
+        rebuilt = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        for _, key, _ in rows:
+            rebuilt.add(key)
+        self._filter = rebuilt
+        self._last_id = 0
+        self._unsettled_ids = set()
+        self._advance(rows)
+
+    def _advance(self, rows):
+        """Move the sync cursor past the leading ``rows`` (id order, all in the filter) that have settled"""
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)
+        for row_id, _, created_at in rows:
+            if self.settle_seconds > 0 and created_at is not None:
+                created_at = created_at if created_at.tzinfo else created_at.replace(tzinfo=timezone.utc)
+                if created_at > settled_before:
+                    # This one and the rest are read again until they settle
+                    self._unsettled_ids.update(later_id for later_id, _, _ in rows if later_id >= row_id)
+                    break
+            self._last_id = row_id
+        self._unsettled_ids = {row_id for row_id in self._unsettled_ids if row_id > self._last_id}
+
+revocation_list = RevocationList(
+    REVOCATION_SYNC_SECONDS, REVOCATION_REBUILD_SECONDS, REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE
+)
@@ -0,0 +1,214 @@
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from .. import models
+
+SENTIMENT_POSITIVE_THRESHOLD = float(os.getenv("SENTIMENT_POSITIVE_THRESHOLD", "0.3"))
+SENTIMENT_NEGATIVE_THRESHOLD = float(os.getenv("SENTIMENT_NEGATIVE_THRESHOLD", "-0.3"))
+# Optional JSON file of {"word": weight} merged over the built-in lexicon
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH")
+SENTIMENT_BACKFILL_CHUNK_SIZE = int(os.getenv("SENTIMENT_BACKFILL_CHUNK_SIZE", "2000"))
+# Backfills of fewer rows are classified in one process: starting the pool and pickling the
+# chunks costs more than it saves (scripts/bench_sentiment.py: at 5,000 rows two processes
+# did ~10k rows/s against ~21k for one). The pool never gets more processes than CPUs.
+SENTIMENT_POOL_MIN_ROWS = int(os.getenv("SENTIMENT_POOL_MIN_ROWS", "50000"))
+
+DEFAULT_LEXICON = {
+    # positive
+    "excellent": 2.0, "outstanding": 2.0, "exceptional": 2.0, "great": 1.5, "fantastic": 2.0,
+    "impressive": 1.5, "strong": 1.0, "good": 1.0, "well": 0.5, "solid": 1.0, "reliable": 1.0,
+    "consistent": 0.8, "consistently": 0.8, "thorough": 1.0, "clear": 0.8, "helpful": 1.2,
+    "proactive": 1.2, "creative": 1.0, "efficient": 1.0, "effective": 1.0, "valuable": 1.2,
+    "positive": 1.0, "collaborative": 1.0, "dependable": 1.0, "skilled": 1.0, "talented": 1.2,
+    "appreciate": 1.2, "appreciated": 1.2, "thanks": 1.0, "thank": 1.0, "love": 1.5,
+    "happy": 1.2, "pleased": 1.2, "proud": 1.2, "exceeded": 1.5, "exceeds": 1.5, "improved": 0.8,
+    "success": 1.2, "successful": 1.2, "successfully": 1.2, "leadership": 0.5, "initiative": 0.8,
+    "supportive": 1.0, "dedicated": 1.0, "excels": 1.5, "excelled": 1.5, "kudos": 1.5,
+    # negative
+    "poor": -1.5, "bad": -1.5, "weak": -1.0, "late": -1.0, "missed": -1.2, "missing": -0.8,
+    "miss": -0.8, "fail": -1.5, "failed": -1.5, "failure": -1.5, "failing": -1.5,
+    "unacceptable": -2.0, "disappointing": -1.8, "disappointed": -1.8, "concern": -1.0,
+    "concerns": -1.0, "concerned": -1.0, "problem": -1.0, "problems": -1.0, "issue": -0.7,
+    "issues": -0.7, "mistake": -1.0, "mistakes": -1.0, "errors": -0.8, "sloppy": -1.5,
+    "careless": -1.5, "unreliable": -1.5, "inconsistent": -1.0, "slow": -0.8, "delayed": -0.8,
+    "delays": -0.8, "struggle": -1.0, "struggled": -1.0, "struggles": -1.0, "struggling": -1.0,
+    "lacks": -1.0, "lacking": -1.0, "lack": -1.0, "unclear": -0.8, "rude": -1.8,
+    "unprofessional": -2.0, "negative": -1.0, "worse": -1.5, "worst": -2.0, "frustrating": -1.5,
+    "frustrated": -1.5, "difficult": -0.8, "ignored": -1.2, "needs": -0.3, "must": -0.3,
+    "blocker": -1.0, "incomplete": -1.0, "below": -0.8,
+}
+
+NEGATIONS = {"not", "no", "never", "hardly", "barely", "without", "nor"}
+INTENSIFIERS = {"very": 1.5, "extremely": 2.0, "really": 1.3, "highly": 1.5, "truly": 1.3, "so": 1.2, "slightly": 0.5}
+NEGATION_WINDOW = 3
+
+# Suggestions for areas to improve are expected even in positive reviews, so they count for less
+FIELD_WEIGHTS = (1.0, 0.7, 0.4)  # content, strengths, areas_to_improve
+
+LABELS = {
+    1: models.FeedbackSentiment.POSITIVE,
+    0: models.FeedbackSentiment.NEUTRAL,
+    -1: models.FeedbackSentiment.NEGATIVE,
+}
+
+# Words, plus punctuation that ends a negation's scope
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?|[.,;:!?]")
+CLAUSE_BREAKS = set(".,;:!?")
+
+class SentimentClassifier:
+    """
+    Local lexicon-based linear sentiment model.
+
+    Text is tokenised in Python into (document, feature, factor) triples,
+    where the factor carries field weight, negation (sign flip for the next
+    few words after "not", "never", "isn't", ... within the same clause) and
+    intensifiers. The triples are accumulated into a document x vocabulary
+    matrix with NumPy and scored with one matrix-vector product against the
+    lexicon weights, so a whole chunk of rows is scored at once. Scores are
+    normalised by the square root of the document length and mapped to
+    FeedbackSentiment with two thresholds.
+    """
+
+    def __init__(self, lexicon: dict, positive_threshold: float, negative_threshold: float):
+        self.vocabulary = {word: i for i, word in enumerate(lexicon)}
+        self.weights = np.array(list(lexicon.values()), dtype=np.float32)
+        self.positive_threshold = positive_threshold
+        self.negative_threshold = negative_threshold
+
+    def score_batch(self, documents) -> np.ndarray:
+        """Scores for ``documents``, each a sequence of field texts (content, strengths, areas_to_improve)"""
+        doc_index, feature_index, factors = [], [], []
+        lengths = np.ones(len(documents), dtype=np.float32)
+        vocabulary = self.vocabulary
+
+        for doc, fields in enumerate(documents):
+            length = 0
+            for field_weight, text in zip(FIELD_WEIGHTS, fields):
+                if not text:
+                    continue
+                tokens = TOKEN_PATTERN.findall(text.lower())
+                length += len(tokens)
+                negated_until = -1
+                boost = 1.0
+                for position, token in enumerate(tokens):
+                    if token in CLAUSE_BREAKS:
+                        negated_until = -1
+                        length -= 1
+                        continue
+                    if token in NEGATIONS or token.endswith("n't"):
+                        negated_until = position + NEGATION_WINDOW
+                        continue
+                    if token in INTENSIFIERS:
+                        boost = INTENSIFIERS[token]
+                        continue
+                    feature = vocabulary.get(token)
+                    if feature is not None:
+                        doc_index.append(doc)
+                        feature_index.append(feature)
+                        factors.append(field_weight * boost * (-1.0 if position <= negated_until else 1.0))
+                    boost = 1.0
+            lengths[doc] = max(length, 1)
+
+        counts = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        np.add.at(counts, (np.array(doc_index, dtype=np.intp), np.array(feature_index, dtype=np.intp)),
+                  np.array(factors, dtype=np.float32))
+        return counts @ self.weights / np.sqrt(lengths)
+
+    def labels(self, scores: np.ndarray) -> list:
+        # 1 = positive, 0 = neutral, -1 = negative
+        codes = (scores >= self.positive_threshold).astype(np.int8) - (scores <= self.negative_threshold)
+        return [LABELS[code] for code in codes.tolist()]
+
+    def classify_batch(self, documents) -> list:
+        return self.labels(self.score_batch(documents))
+
+    def classify(self, content: str, strengths: str = None, areas_to_improve: str = None):
+        """(sentiment, score) for a single piece of feedback"""
+        score = float(self.score_batch([(content, strengths, areas_to_improve)])[0])
+        return self.labels(np.array([score]))[0], score
+
+def _load_lexicon():
+    lexicon = dict(DEFAULT_LEXICON)
+    if SENTIMENT_LEXICON_PATH:
+        with open(SENTIMENT_LEXICON_PATH) as f:
+            lexicon.update({word.lower(): float(weight) for word, weight in json.load(f).items()})
+    return lexicon
+
+sentiment_classifier = SentimentClassifier(
+    _load_lexicon(), SENTIMENT_POSITIVE_THRESHOLD, SENTIMENT_NEGATIVE_THRESHOLD
+)
+
+def _classify_chunk(documents):
+    # Runs in pool workers; returns plain values so results pickle cheaply
+    return [sentiment.value for sentiment in sentiment_classifier.classify_batch(documents)]
+
+def backfill_workers(rows: int, workers: int) -> int:
+    """Classifier processes worth using for ``rows`` rows when ``workers`` are asked for"""
+    if rows < SENTIMENT_POOL_MIN_ROWS:
+        return 1
+    return max(1, min(workers, os.cpu_count() or 1))
+
+def backfill_sentiment(db: Session, chunk_size: int = SENTIMENT_BACKFILL_CHUNK_SIZE, workers: int = 1) -> int:
+    """
+    Classify every feedback row without a sentiment and store the result.
+
+    Rows are read in primary-key order in chunks of ``chunk_size``. When
+    ``workers`` > 1 and at least SENTIMENT_POOL_MIN_ROWS rows are pending,
+    chunks are classified in a process pool (see ``backfill_workers``) while
+    the next chunks are read, keeping up to two chunks per worker in flight. Each
+    chunk is written with one executemany UPDATE that skips rows whose
+    sentiment was set in the meantime, and committed on its own so an
+    interrupted run can simply be restarted. Returns the number of rows
+    updated. No change events are recorded for backfilled rows.
+    """
+    table = models.Feedback.__table__
+    statement = update(table).where(
+        table.c.id == bindparam("row_id"), table.c.sentiment.is_(None)
+    ).values(sentiment=bindparam("label"))
+
+    def write(ids, labels):
+        result = db.execute(statement, [
+            {"row_id": row_id, "label": models.FeedbackSentiment(label)} for row_id, label in zip(ids, labels)
+        ])
+        db.commit()
+        return max(result.rowcount, 0)
+
+    if workers > 1:
+        pending = db.query(func.count(models.Feedback.id)).filter(models.Feedback.sentiment.is_(None)).scalar()
+        workers = backfill_workers(pending, workers)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight = deque()
+    after_id = 0
+    updated = 0
+    try:
+        while True:
+            rows = db.query(
+                models.Feedback.id, models.Feedback.content, models.Feedback.strengths, models.Feedback.areas_to_improve
+            ).filter(
+                models.Feedback.sentiment.is_(None),
+                models.Feedback.id > after_id
+            ).order_by(models.Feedback.id).limit(chunk_size).all()
+            if rows:
+                after_id = rows[-1][0]
+                ids = [row[0] for row in rows]
+                documents = [tuple(row[1:]) for row in rows]
+                if pool is None:
+                    updated += write(ids, _classify_chunk(documents))
+                    continue
+                in_flight.append((ids, pool.submit(_classify_chunk, documents)))
+
+            while in_flight and (not rows or len(in_flight) >= workers * 2):
+                ids, future = in_flight.popleft()
+                updated += write(ids, future.result())
+            if not rows and not in_flight:
+                return updated
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
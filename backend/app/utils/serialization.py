@@ -0,0 +1,128 @@
+from collections import defaultdict
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+
+# Columns returned for schemas.Feedback, in schema order (tags are attached separately)
+FEEDBACK_FIELDS = (
+    "id",
+    "content",
+    "strengths",
+    "areas_to_improve",
+    "sentiment",
+    "is_anonymous",
+    "manager_id",
+    "employee_id",
+    "is_acknowledged",
+    "created_at",
+    "updated_at",
+    "feedback_request_id",
+    "comment_count",
+    "last_activity_at",
+)
+
+# Summary projection: everything except the text bodies, plus a short preview of `content`
+FEEDBACK_SUMMARY_FIELDS = (
+    "id",
+    "manager_id",
+    "employee_id",
+    "sentiment",
+    "is_anonymous",
+    "is_acknowledged",
+    "created_at",
+    "updated_at",
+    "feedback_request_id",
+    "comment_count",
+    "last_activity_at",
+    "preview",
+)
+
+FEEDBACK_PREVIEW_LENGTH = 200
+
+# Everything a client may ask for with ?fields= on feedback lists
+FEEDBACK_SELECTABLE_FIELDS = FEEDBACK_FIELDS + ("tags", "preview")
+
+USER_FIELDS = (
+    "id",
+    "email",
+    "full_name",
+    "role",
+    "is_active",
+    "manager_id",
+    "organization_id",
+)
+
+NOTIFICATION_FIELDS = (
+    "id",
+    "user_id",
+    "message",
+    "read",
+    "related_feedback_id",
+    "related_request_id",
+    "created_at",
+)
+
+def columns(model, fields: Sequence[str]):
+    """Return the mapped columns for ``fields`` so queries select plain tuples."""
+    return [getattr(model, field) for field in fields]
+
+def rows_to_dicts(rows: Iterable, fields: Sequence[str]) -> List[dict]:
+    """
+    Build response payloads straight from column tuples, skipping ORM
+    hydration and Pydantic validation. The result is meant to be returned
+    through an ORJSONResponse, which encodes datetimes and enums natively.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+def attach_feedback_tags(db: Session, items: List[dict]) -> List[dict]:
+    """Fill in ``tags`` for feedback payloads with a single query for the whole page"""
+    for item in items:
+        item["tags"] = []
+    if not items:
+        return items
+
+    tags_by_feedback = defaultdict(list)
+    tag_rows = db.query(models.FeedbackTag.feedback_id, models.FeedbackTag.tag_name).filter(
+        models.FeedbackTag.feedback_id.in_([item["id"] for item in items])
+    ).all()
+    for feedback_id, tag_name in tag_rows:
+        tags_by_feedback[feedback_id].append(tag_name)
+
+    for item in items:
+        item["tags"] = tags_by_feedback.get(item["id"], [])
+    return items
+
+def feedback_rows_to_dicts(db: Session, rows: Iterable) -> List[dict]:
+    return attach_feedback_tags(db, rows_to_dicts(rows, FEEDBACK_FIELDS))
+
+def feedback_fields(view: schemas.FeedbackView = schemas.FeedbackView.FULL, fields: Optional[Sequence[str]] = None):
+    """Fields returned for a feedback list: an explicit ``fields=`` selection wins over the view"""
+    if fields:
+        return tuple(fields)
+    if view == schemas.FeedbackView.SUMMARY:
+        return FEEDBACK_SUMMARY_FIELDS
+    return FEEDBACK_FIELDS + ("tags",)
+
+def feedback_list_columns(view: schemas.FeedbackView = schemas.FeedbackView.FULL, fields: Optional[Sequence[str]] = None):
+    """Columns to select for a feedback list in the requested view or field selection"""
+    selected = []
+    for field in feedback_fields(view, fields):
+        if field == "tags":
+            continue  # loaded separately by attach_feedback_tags
+        if field == "preview":
+            selected.append(func.substr(models.Feedback.content, 1, FEEDBACK_PREVIEW_LENGTH).label("preview"))
+        else:
+            selected.append(getattr(models.Feedback, field))
+    return selected
+
+def feedback_list_payload(db: Session, rows: Iterable, view: schemas.FeedbackView = schemas.FeedbackView.FULL,
+                          fields: Optional[Sequence[str]] = None) -> List[dict]:
+    """Build the response payload for rows selected with ``feedback_list_columns(view, fields)``"""
+    selected = feedback_fields(view, fields)
+    items = rows_to_dicts(rows, [field for field in selected if field != "tags"])
+    if "tags" in selected:
+        attach_feedback_tags(db, items)
+    return items
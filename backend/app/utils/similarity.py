@@ -0,0 +1,231 @@
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+
+from .. import models
+
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+SIMILARITY_INDEX_CHUNK_SIZE = int(os.getenv("SIMILARITY_INDEX_CHUNK_SIZE", "1000"))
+# Distinct texts a single LSH bucket may start clusters for; later members matching none of them are left to other bands
+SIMILARITY_MAX_BUCKET_REPRESENTATIVES = int(os.getenv("SIMILARITY_MAX_BUCKET_REPRESENTATIVES", "8"))
+
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a bucket,
+# pairs below ~0.4 almost never do
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures stored in the database must stay comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, np.iinfo(np.int64).max, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, np.iinfo(np.int64).max, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def feedback_text(content, strengths, areas_to_improve) -> str:
+    return " ".join(part for part in (content, strengths, areas_to_improve) if part)
+
+def shingles(text: str) -> set:
+    """Word n-grams of the normalised text (case and punctuation ignored)"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERMUTATIONS uint32 values) of the text's shingles"""
+    hashed = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles(text)), dtype=np.uint64
+    )
+    if hashed.size == 0:
+        return np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+    # One row per permutation, one column per shingle; uint64 arithmetic wraps like the reference implementation
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(_A, hashed) + _B[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def estimated_similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two texts' shingle sets"""
+    return float(np.count_nonzero(left == right)) / NUM_PERMUTATIONS
+
+def band_buckets(signature: np.ndarray) -> list:
+    """One 64-bit bucket key per band"""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "big", signed=True)
+        for band in signature.reshape(BANDS, ROWS_PER_BAND)
+    ]
+
+def _unpack(blob) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.uint32)
+
+def index_feedback(db: Session, feedback: models.Feedback):
+    """
+    (Re)index one feedback's text. Call after the row is flushed and before
+    the commit, so the index changes with the feedback in one transaction.
+    """
+    signature = minhash(feedback_text(feedback.content, feedback.strengths, feedback.areas_to_improve))
+    _store(db, [(feedback.id, feedback.manager_id, signature)])
+
+def _store(db: Session, entries):
+    """Replace the signatures and buckets of ``entries`` ((feedback_id, manager_id, signature) tuples)"""
+    ids = [feedback_id for feedback_id, _, _ in entries]
+    db.query(models.FeedbackLshBucket).filter(models.FeedbackLshBucket.feedback_id.in_(ids)).delete(synchronize_session=False)
+    db.query(models.FeedbackSignature).filter(models.FeedbackSignature.feedback_id.in_(ids)).delete(synchronize_session=False)
+    db.execute(insert(models.FeedbackSignature), [
+        {"feedback_id": feedback_id, "manager_id": manager_id, "signature": signature.tobytes()}
+        for feedback_id, manager_id, signature in entries
+    ])
+    db.execute(insert(models.FeedbackLshBucket), [
+        {"feedback_id": feedback_id, "manager_id": manager_id, "band": band, "bucket": bucket}
+        for feedback_id, manager_id, signature in entries
+        for band, bucket in enumerate(band_buckets(signature))
+    ])
+
+def index_missing(db: Session, chunk_size: int = SIMILARITY_INDEX_CHUNK_SIZE) -> int:
+    """Index feedback rows that have no signature yet (history from before the index existed)"""
+    indexed = 0
+    after_id = 0
+    while True:
+        rows = db.query(
+            models.Feedback.id, models.Feedback.manager_id,
+            models.Feedback.content, models.Feedback.strengths, models.Feedback.areas_to_improve
+        ).outerjoin(
+            models.FeedbackSignature, models.FeedbackSignature.feedback_id == models.Feedback.id
+        ).filter(
+            models.FeedbackSignature.feedback_id.is_(None),
+            models.Feedback.id > after_id
+        ).order_by(models.Feedback.id).limit(chunk_size).all()
+        if not rows:
+            return indexed
+        _store(db, [(row[0], row[1], minhash(feedback_text(*row[2:]))) for row in rows])
+        db.commit()
+        after_id = rows[-1][0]
+        indexed += len(rows)
+
+def similar_feedback(db: Session, feedback_id: int, threshold: float = SIMILARITY_THRESHOLD) -> list:
+    """
+    Feedback by the same manager whose text is similar to ``feedback_id``'s,
+    as (feedback_id, similarity) pairs, most similar first.
+
+    Candidates come from the LSH bucket index (same manager, band and bucket),
+    so the cost depends on the number of candidates rather than on how much
+    feedback the manager has written; their signatures are then compared.
+    """
+    own = db.query(models.FeedbackSignature).filter(models.FeedbackSignature.feedback_id == feedback_id).first()
+    if own is None:
+        return []
+    signature = _unpack(own.signature)
+    keys = list(enumerate(band_buckets(signature)))
+
+    candidates = db.query(models.FeedbackSignature.feedback_id, models.FeedbackSignature.signature).filter(
+        models.FeedbackSignature.feedback_id.in_(
+            db.query(models.FeedbackLshBucket.feedback_id).filter(
+                models.FeedbackLshBucket.manager_id == own.manager_id,
+                tuple_(models.FeedbackLshBucket.band, models.FeedbackLshBucket.bucket).in_(keys),
+                models.FeedbackLshBucket.feedback_id != feedback_id
+            )
+        )
+    ).all()
+
+    matches = [
+        (candidate_id, estimated_similarity(signature, _unpack(blob))) for candidate_id, blob in candidates
+    ]
+    return sorted(
+        [(candidate_id, similarity) for candidate_id, similarity in matches if similarity >= threshold],
+        key=lambda match: -match[1]
+    )
+
+def duplicate_clusters(db: Session, manager_id: int = None, threshold: float = SIMILARITY_THRESHOLD) -> list:
+    """
+    Groups of near-identical feedback written by the same manager.
+
+    Candidates are the feedback sharing an LSH bucket (found with one
+    GROUP BY over the bucket index, not by comparing every pair). Within a
+    bucket each member is compared with the bucket's representatives (the
+    first members that matched no earlier one, at most
+    SIMILARITY_MAX_BUCKET_REPRESENTATIVES) and joined to the first whose
+    signature agrees on at least ``threshold`` of the permutations, so the
+    work grows linearly with the bucket size. Returns dicts with manager_id,
+    feedback_ids and the lowest similarity among the cluster's confirmed
+    pairs, largest clusters first.
+    """
+    Bucket = models.FeedbackLshBucket
+    shared = db.query(Bucket.manager_id, Bucket.band, Bucket.bucket).group_by(
+        Bucket.manager_id, Bucket.band, Bucket.bucket
+    ).having(func.count() > 1)
+    if manager_id is not None:
+        shared = shared.filter(Bucket.manager_id == manager_id)
+    shared = shared.subquery()
+
+    members = db.query(Bucket.manager_id, Bucket.band, Bucket.bucket, Bucket.feedback_id).join(
+        shared,
+        (Bucket.manager_id == shared.c.manager_id) & (Bucket.band == shared.c.band) & (Bucket.bucket == shared.c.bucket)
+    ).order_by(Bucket.manager_id, Bucket.band, Bucket.bucket, Bucket.feedback_id).all()
+
+    groups = {}
+    for owner, band, bucket, feedback_id in members:
+        groups.setdefault((owner, band, bucket), []).append(feedback_id)
+    if not groups:
+        return []
+
+    ids = sorted({feedback_id for bucket_ids in groups.values() for feedback_id in bucket_ids})
+    signatures = {}
+    for start in range(0, len(ids), SIMILARITY_INDEX_CHUNK_SIZE):
+        for feedback_id, blob in db.query(models.FeedbackSignature.feedback_id, models.FeedbackSignature.signature).filter(
+            models.FeedbackSignature.feedback_id.in_(ids[start:start + SIMILARITY_INDEX_CHUNK_SIZE])
+        ):
+            signatures[feedback_id] = _unpack(blob)
+
+    # Union-find over the confirmed (member, representative) pairs
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    owners = {}
+    confirmed = []
+    for (owner, _, _), bucket_ids in groups.items():
+        # Each member is checked against the bucket's representatives only, not
+        # against every other member, so a large bucket costs O(n) comparisons
+        representatives = []
+        for feedback_id in bucket_ids:
+            for representative in representatives:
+                similarity = estimated_similarity(signatures[representative], signatures[feedback_id])
+                if similarity >= threshold:
+                    root_left, root_right = find(representative), find(feedback_id)
+                    if root_left != root_right:
+                        parent[root_right] = root_left
+                    owners[representative] = owners[feedback_id] = owner
+                    confirmed.append((representative, similarity))
+                    break
+            else:
+                if len(representatives) < SIMILARITY_MAX_BUCKET_REPRESENTATIVES:
+                    representatives.append(feedback_id)
+
+    clusters = {}
+    for feedback_id in owners:
+        clusters.setdefault(find(feedback_id), {"ids": [], "min_similarity": 1.0})["ids"].append(feedback_id)
+    for left, similarity in confirmed:
+        cluster = clusters[find(left)]
+        cluster["min_similarity"] = min(cluster["min_similarity"], similarity)
+    result = [
+        {
+            "manager_id": owners[cluster["ids"][0]],
+            "feedback_ids": sorted(cluster["ids"]),
+            "min_similarity": round(cluster["min_similarity"], 3),
+        }
+        for cluster in clusters.values()
+    ]
+    return sorted(result, key=lambda cluster: (-len(cluster["feedback_ids"]), cluster["manager_id"]))
@@ -1,15 +1,28 @@
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
+import os
 from datetime import datetime
 
-from app.database import engine, Base
-from app.routers import users, auth, feedback, dashboard, feedback_requests, notifications
+from app.database import LAST_WRITE_HEADER, ReadYourWritesMiddleware, engine, replica_engines, tenant_engines, init_schema
+from app.utils.compression import CompressionMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils import profiling
+from app.utils.ratelimit import ConcurrencyLimitMiddleware, RateLimitMiddleware
+from app.routers import users, auth, feedback, dashboard, feedback_requests, notifications, changes, timeline, health
+from app.routers import profiling as profiling_routes
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables. Under gunicorn (preload_app) this runs once in the master before
+# the workers fork; set SCHEMA_INIT=0 when the schema is managed elsewhere.
+if os.getenv("SCHEMA_INIT", "1") == "1":
+    init_schema()
 
-app = FastAPI(title="Feedback System API")
+app = FastAPI(title="Feedback System API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 origins = [
@@ -20,12 +33,34 @@ origins = [
     "*",  # Allow all origins temporarily to fix connection issues
 ]
 
+# On-demand profiling (PROFILING_ENABLED=1): innermost, so it times the application itself.
+# When disabled nothing is installed and requests pay nothing.
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Tell clients when they last wrote, so their next reads avoid lagging replicas and
+# stale per-worker caches whichever worker serves them
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Replay stored responses for retried creates that carry an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Compress larger JSON responses (brotli when available, otherwise gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Per-user/per-IP token buckets (429), then load shedding (503) when the worker is saturated.
+# Added after the other middleware so rejected requests are turned away before any work is done.
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ConcurrencyLimitMiddleware)
+
+# Outermost, so every response, including 429/503 and replayed ones, carries the CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
 # Include routers
@@ -35,6 +70,24 @@ app.include_router(feedback.router, prefix="/api", tags=["feedback"])
 app.include_router(feedback_requests.router, prefix="/api", tags=["feedback-requests"])
 app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
 app.include_router(notifications.router, prefix="/api", tags=["notifications"])
+app.include_router(changes.router, prefix="/api", tags=["changes"])
+app.include_router(timeline.router, prefix="/api", tags=["timeline"])
+app.include_router(health.router, tags=["health"])
+if profiling.PROFILING_ENABLED:
+    app.include_router(profiling_routes.router, tags=["admin"])
+    profiling.instrument(app)
+
+@app.on_event("startup")
+async def log_startup_time():
+    print(f"Application ready {time.perf_counter() - _import_started:.3f}s after import (pid {os.getpid()})")
+
+@app.on_event("shutdown")
+async def close_connections():
+    engine.dispose()
+    for replica in replica_engines:
+        replica.dispose()
+    for tenant in list(tenant_engines.values()):
+        tenant.dispose()
 
 @app.get("/")
 async def root():
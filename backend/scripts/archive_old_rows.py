@@ -0,0 +1,41 @@
+"""Move old acknowledged feedback and read notifications to the compressed archive.
+
+Archived feedback stays readable through GET /api/feedback/{id} and
+GET /api/feedback/export. Run from cron; re-running only picks up rows that
+have aged past the horizon since the last run. In database-per-tenant mode
+every organization's database is archived.
+
+Usage:
+    python scripts/archive_old_rows.py [--feedback-days 365] [--notification-days 90] [--segment-size 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import init_schema, maintenance_sessions
+from app import models  # noqa: F401  (registers the tables for init_schema)
+from app.utils.archive import (
+    ARCHIVE_FEEDBACK_AFTER_DAYS, ARCHIVE_NOTIFICATIONS_AFTER_DAYS, ARCHIVE_SEGMENT_SIZE, archive_old_rows
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feedback-days", type=float, default=ARCHIVE_FEEDBACK_AFTER_DAYS)
+    parser.add_argument("--notification-days", type=float, default=ARCHIVE_NOTIFICATIONS_AFTER_DAYS)
+    parser.add_argument("--segment-size", type=int, default=ARCHIVE_SEGMENT_SIZE)
+    args = parser.parse_args()
+
+    init_schema()
+    started = time.perf_counter()
+    archived = {"feedback": 0, "notification": 0}
+    for _, db in maintenance_sessions():
+        for kind, count in archive_old_rows(db, args.feedback_days, args.notification_days, args.segment_size).items():
+            archived[kind] += count
+    print(f"Archived {archived['feedback']} feedback and {archived['notification']} notification(s) "
+          f"in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
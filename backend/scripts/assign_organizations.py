@@ -0,0 +1,95 @@
+"""Put existing users and their data into organizations.
+
+Adds the organization columns and indexes to an existing database (via
+init_schema), then gives every top-level user without an organization a new
+organization of their own and copies it down their reporting line. Feedback,
+requests, comments, tags and notifications take the organization of the user
+they belong to. Safe to re-run: rows that already have an organization are
+left alone.
+
+Usage:
+    python scripts/assign_organizations.py [--single NAME]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal, init_schema
+from app import models
+
+def _from_owner(db, model, owner_column, owner_model, owner_key):
+    """Set model.organization_id from the row ``owner_column`` points at"""
+    owner_organization = select(owner_model.organization_id).where(
+        owner_key == owner_column
+    ).scalar_subquery()
+    result = db.execute(
+        update(model).where(model.organization_id.is_(None)).values(organization_id=owner_organization),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--single", metavar="NAME", help="Put everything unassigned into one organization with this name")
+    args = parser.parse_args()
+
+    init_schema()
+    db = SessionLocal()
+    try:
+        User = models.User
+        if args.single:
+            organization = models.Organization(name=args.single)
+            db.add(organization)
+            db.flush()
+            roots = db.query(User).filter(User.organization_id.is_(None)).all()
+        else:
+            roots = db.query(User).filter(User.organization_id.is_(None), User.manager_id.is_(None)).all()
+        for root in roots:
+            if not args.single:
+                organization = models.Organization(name=f"{root.full_name}'s organization")
+                db.add(organization)
+                db.flush()
+            root.organization_id = organization.id
+        db.flush()
+        print(f"Assigned {len(roots)} user(s) directly")
+
+        # Copy organizations down the reporting lines, one level per pass
+        users = User.__table__
+        managers = users.alias("managers")
+        level = 0
+        while True:
+            result = db.execute(
+                update(users).where(
+                    users.c.organization_id.is_(None),
+                    users.c.manager_id.in_(select(managers.c.id).where(managers.c.organization_id.isnot(None)))
+                ).values(organization_id=select(managers.c.organization_id).where(
+                    managers.c.id == users.c.manager_id
+                ).scalar_subquery())
+            )
+            if not result.rowcount:
+                break
+            level += 1
+            print(f"Level {level}: assigned {result.rowcount} report(s)")
+
+        counts = {
+            "feedback": _from_owner(db, models.Feedback, models.Feedback.manager_id, User, User.id),
+            "feedback requests": _from_owner(db, models.FeedbackRequest, models.FeedbackRequest.employee_id, User, User.id),
+            "notifications": _from_owner(db, models.Notification, models.Notification.user_id, User, User.id),
+        }
+        db.flush()
+        counts["comments"] = _from_owner(
+            db, models.FeedbackComment, models.FeedbackComment.feedback_id, models.Feedback, models.Feedback.id
+        )
+        counts["tags"] = _from_owner(db, models.FeedbackTag, models.FeedbackTag.feedback_id, models.Feedback, models.Feedback.id)
+        db.commit()
+        for name, count in counts.items():
+            print(f"Assigned {count} {name}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Fill in comment_count and last_activity_at of feedback rows that have none.
+
+Run once after upgrading: the columns are added empty to existing
+databases. Safe to re-run: only rows still without a count are touched.
+In database-per-tenant mode every organization's database is backfilled.
+
+Usage:
+    python scripts/backfill_comment_counts.py [--chunk-size 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from app.database import init_schema, maintenance_sessions
+from app import models
+
+def backfill(db, chunk_size):
+    Comment = models.FeedbackComment
+    on_feedback = Comment.feedback_id == models.Feedback.id
+    updated = 0
+    while True:
+        # Short transactions: one chunk of ids at a time
+        ids = [row_id for row_id, in db.query(models.Feedback.id).filter(
+            models.Feedback.comment_count.is_(None)
+        ).order_by(models.Feedback.id).limit(chunk_size)]
+        if not ids:
+            return updated
+        db.query(models.Feedback).filter(models.Feedback.id.in_(ids)).update({
+            models.Feedback.comment_count: select(func.count(Comment.id)).where(on_feedback).scalar_subquery(),
+            models.Feedback.last_activity_at: select(func.max(Comment.created_at)).where(on_feedback).scalar_subquery(),
+            models.Feedback.updated_at: models.Feedback.updated_at,
+        }, synchronize_session=False)
+        db.commit()
+        updated += len(ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    init_schema()
+    started = time.perf_counter()
+    updated = 0
+    for _, db in maintenance_sessions():
+        updated += backfill(db, args.chunk_size)
+    print(f"Counted comments of {updated} feedback row(s) in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
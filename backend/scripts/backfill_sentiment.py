@@ -0,0 +1,38 @@
+"""Fill in the sentiment of feedback rows that have none (e.g. imported history).
+
+Uses the local lexicon model from app/utils/sentiment.py; nothing leaves the
+machine. Safe to re-run: only rows still without a sentiment are touched.
+In database-per-tenant mode every organization's database is backfilled.
+
+Usage:
+    python scripts/backfill_sentiment.py [--chunk-size 2000] [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import init_schema, maintenance_sessions
+from app import models  # noqa: F401  (registers the tables for init_schema)
+from app.utils.sentiment import SENTIMENT_BACKFILL_CHUNK_SIZE, backfill_sentiment
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=SENTIMENT_BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Classifier processes (1 classifies in this process; more are only used "
+                             "from SENTIMENT_POOL_MIN_ROWS pending rows)")
+    args = parser.parse_args()
+
+    init_schema()
+    started = time.perf_counter()
+    updated = 0
+    for _, db in maintenance_sessions():
+        updated += backfill_sentiment(db, chunk_size=args.chunk_size, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"Classified {updated} feedback row(s) in {elapsed:.2f}s ({updated / max(elapsed, 1e-9):.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
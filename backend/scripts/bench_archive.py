@@ -0,0 +1,128 @@
+"""Hot-table size and query latency before and after archiving.
+
+Seeds a throwaway SQLite file with several years of feedback and
+notifications, times the queries behind the feedback list, the manager
+dashboard and the notification list, archives everything past the horizon,
+vacuums, and times them again. Also times reading one archived feedback.
+
+Usage:
+    python scripts/bench_archive.py [--rows 50000] [--years 4] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.utils import archive, serialization
+
+MANAGERS = 20
+
+def seed(db, rows, years):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    db.execute(insert(models.User), [
+        {"id": i, "email": f"user{i}@example.com", "full_name": f"User {i}",
+         "role": models.UserRole.MANAGER if i <= MANAGERS else models.UserRole.EMPLOYEE,
+         "manager_id": None if i <= MANAGERS else (i % MANAGERS) + 1}
+        for i in range(1, MANAGERS * 11 + 1)
+    ])
+    feedback, notifications = [], []
+    for i in range(1, rows + 1):
+        created = now - timedelta(days=rng.uniform(0, 365 * years))
+        manager_id = rng.randint(1, MANAGERS)
+        employee_id = MANAGERS * rng.randint(1, 10) + manager_id
+        old = created < now - timedelta(days=365)
+        feedback.append({
+            "id": i, "content": "Consistent delivery this quarter. " * 8, "strengths": "Ownership. " * 6,
+            "areas_to_improve": "Share context earlier. " * 6, "sentiment": list(models.FeedbackSentiment)[i % 3],
+            "manager_id": manager_id, "employee_id": employee_id, "is_acknowledged": old or rng.random() < 0.5,
+            "created_at": created, "updated_at": created,
+        })
+        notifications.append({
+            "user_id": employee_id, "message": "You have received new feedback", "read": old,
+            "related_feedback_id": i, "created_at": created,
+        })
+    db.execute(insert(models.Feedback), feedback)
+    db.execute(insert(models.Notification), notifications)
+    db.commit()
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def measure(db, path, repeat):
+    manager_id, employee_id = 1, MANAGERS + 1
+    queries = {
+        "feedback list (manager)": lambda: serialization.feedback_rows_to_dicts(db, db.query(
+            *serialization.columns(models.Feedback, serialization.FEEDBACK_FIELDS)
+        ).filter(models.Feedback.manager_id == manager_id).offset(0).limit(100).all()),
+        "dashboard sentiment counts": lambda: db.query(models.Feedback.sentiment, func.count(models.Feedback.id)).filter(
+            models.Feedback.manager_id == manager_id
+        ).group_by(models.Feedback.sentiment).all(),
+        "notification list": lambda: db.query(*serialization.columns(models.Notification, serialization.NOTIFICATION_FIELDS)).filter(
+            models.Notification.user_id == employee_id
+        ).order_by(models.Notification.created_at.desc()).limit(100).all(),
+    }
+    result = {
+        "feedback rows": db.query(func.count(models.Feedback.id)).scalar(),
+        "notification rows": db.query(func.count(models.Notification.id)).scalar(),
+        "file size (MB)": os.path.getsize(path) / 1e6,
+    }
+    for label, query in queries.items():
+        result[f"{label} (ms)"] = timed(query, repeat)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--years", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, args.rows, args.years)
+        before = measure(db, path, args.repeat)
+
+        started = time.perf_counter()
+        archived = archive.archive_old_rows(db, feedback_days=365, notification_days=365)
+        elapsed = time.perf_counter() - started
+        db.close()
+        with engine.connect() as connection:
+            connection.execute(text("VACUUM"))
+        db = sessionmaker(bind=engine)()
+        after = measure(db, path, args.repeat)
+
+        archived_id = db.query(models.ArchivedFeedback.feedback_id).limit(1).scalar()
+        read_ms = timed(lambda: archive.read_archived_feedback(db, archived_id), args.repeat)
+        segments = db.query(func.count(models.ArchiveSegment.id), func.sum(func.length(models.ArchiveSegment.data))).one()
+
+        print(f"Archived {archived['feedback']} feedback and {archived['notification']} notifications "
+              f"in {elapsed:.2f}s into {segments[0]} segments ({(segments[1] or 0) / 1e6:.2f} MB, codec {archive._compress(b'')[0]})")
+        print(f"{'':<36} {'before':>10} {'after':>10}")
+        for key in before:
+            print(f"{key:<36} {before[key]:>10.2f} {after[key]:>10.2f}")
+        print(f"{'read archived feedback by id (ms)':<36} {'':>10} {read_ms:>10.2f}")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
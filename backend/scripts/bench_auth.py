@@ -0,0 +1,98 @@
+"""Per-request cost of authenticating a bearer token.
+
+Compares the previous path (verify the JWT, then look the user up by email
+on every request) with the current one (cached signature check, in-memory
+user and Bloom-filter revocation check) against a throwaway SQLite file
+holding --revoked revocation entries. Also reports the filter's size and
+measured false positive rate.
+
+Usage:
+    python scripts/bench_auth.py [--requests 5000] [--revoked 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+# Point the app at the throwaway database before it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+from sqlalchemy import insert
+
+from app import auth, models
+from app.database import SessionLocal, engine, init_schema
+from app.utils.revocation import BloomFilter, REVOCATION_FILTER_ERROR_RATE, revocation_list, token_key
+
+def timed(label, fn, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    per_request = (time.perf_counter() - started) / requests * 1e6
+    print(f"{label:<48} {per_request:>9.1f} us/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--revoked", type=int, default=10000)
+    args = parser.parse_args()
+
+    init_schema()
+    db = SessionLocal()
+    user = models.User(email="bench@example.com", full_name="Bench", hashed_password="x",
+                       role=models.UserRole.MANAGER, is_active=True)
+    db.add(user)
+    db.commit()
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    db.execute(insert(models.RevokedToken), [
+        {"key": token_key(uuid.uuid4().hex), "expires_at": expires_at} for _ in range(args.revoked)
+    ])
+    db.commit()
+    token = auth.create_tokens(user)["access_token"]
+    kid, keys = auth.signing_keys()
+    db.close()
+
+    def previous():
+        session = SessionLocal()
+        try:
+            payload = jwt.decode(token, keys[kid], algorithms=[auth.ALGORITHM])
+            session.query(models.User).filter(models.User.email == payload["sub"]).first()
+        finally:
+            session.close()
+
+    def current():
+        session = SessionLocal()
+        try:
+            auth.authenticate_token(session, token)
+        finally:
+            session.close()
+
+    def current_cold():
+        auth._verified_claims.cache_clear()
+        auth.forget_user("bench@example.com")
+        current()
+
+    current()  # load the revocation filter and caches once
+    print(f"{args.requests} requests, {args.revoked} revoked tokens")
+    timed("previous: verify JWT + user query", previous, args.requests)
+    timed("current, cold (verify JWT + user query)", current_cold, args.requests)
+    timed("current, warm (all in memory)", current, args.requests)
+
+    probes = 100000
+    full = BloomFilter(revocation_list.capacity, REVOCATION_FILTER_ERROR_RATE)
+    for _ in range(revocation_list.capacity):
+        full.add(token_key(uuid.uuid4().hex))
+    for label, bloom in (("filter", revocation_list._filter), ("filter at capacity", full)):
+        false_positives = sum(token_key(uuid.uuid4().hex) in bloom for _ in range(probes))
+        print(f"{label}: {len(bloom.bits) / 1024:.0f} KiB, {bloom.hashes} hashes, {bloom.count} keys, "
+              f"false positives {false_positives / probes:.4%} (target {REVOCATION_FILTER_ERROR_RATE:.2%})")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Throughput benchmark for the local sentiment classifier and backfill job.
+
+Classifies synthetic feedback in memory (one process, then a process pool),
+then runs the full backfill against a throwaway SQLite file. Prints rows/s.
+
+Usage:
+    python scripts/bench_sentiment.py [--rows 50000] [--chunk-size 2000] [--workers N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.utils import sentiment
+
+SENTENCES = (
+    "Delivered the migration ahead of schedule with excellent documentation.",
+    "Communication with the team was clear and very helpful during the release.",
+    "Missed several deadlines this quarter and the reviews were sloppy.",
+    "The work is solid but not always consistent.",
+    "Attended the planning meetings and updated the tickets.",
+    "There were problems with test coverage that caused issues in production.",
+    "Really appreciated the initiative on the onboarding guide.",
+    "Needs to share progress earlier so blockers don't surprise the team.",
+)
+
+def synthetic_documents(rows, seed=42):
+    rng = random.Random(seed)
+    pick = lambda n: " ".join(rng.choice(SENTENCES) for _ in range(n))
+    return [(pick(4), pick(2), pick(2)) for _ in range(rows)]
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def report(label, rows, elapsed):
+    print(f"{label:<32} {rows / elapsed:>12,.0f} rows/s  ({elapsed:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    documents = synthetic_documents(args.rows)
+
+    started = time.perf_counter()
+    labels = [label for chunk in chunks(documents, args.chunk_size) for label in sentiment._classify_chunk(chunk)]
+    report("classify, 1 process", args.rows, time.perf_counter() - started)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pool.submit(int).result()  # start the workers before timing
+        started = time.perf_counter()
+        pooled = [label for result in pool.map(sentiment._classify_chunk, chunks(documents, args.chunk_size)) for label in result]
+        report(f"classify, {args.workers} processes", args.rows, time.perf_counter() - started)
+    assert pooled == labels
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        db = session_factory()
+        db.execute(insert(models.Feedback), [
+            {"content": content, "strengths": strengths, "areas_to_improve": areas, "manager_id": 1, "employee_id": 2}
+            for content, strengths, areas in documents
+        ])
+        db.commit()
+
+        started = time.perf_counter()
+        updated = sentiment.backfill_sentiment(db, chunk_size=args.chunk_size, workers=args.workers)
+        used = sentiment.backfill_workers(args.rows, args.workers)
+        report(f"backfill (SQLite), {used} process{'es' if used > 1 else ''}", updated, time.perf_counter() - started)
+        assert updated == args.rows
+        db.close()
+        engine.dispose()
+
+    counts = {label: labels.count(label) for label in set(labels)}
+    print(f"label distribution: {counts}")
+
+if __name__ == "__main__":
+    main()
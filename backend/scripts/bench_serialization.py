@@ -0,0 +1,103 @@
+"""Microbenchmark for feedback list serialisation.
+
+Compares the per-row cost of the old path (ORM hydration + schemas.Feedback
+validation + jsonable_encoder/json.dumps) with the column-tuple path used by
+the list endpoints (tuples -> dicts -> orjson). Uses a throwaway SQLite file.
+
+Usage:
+    python scripts/bench_serialization.py [--rows 100] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Load, sessionmaker, selectinload
+
+from app import models, schemas
+from app.database import Base
+from app.utils import serialization
+
+def seed(db, rows):
+    manager = models.User(email="manager@example.com", full_name="Manager", role=models.UserRole.MANAGER)
+    employee = models.User(email="employee@example.com", full_name="Employee", role=models.UserRole.EMPLOYEE)
+    db.add_all([manager, employee])
+    db.commit()
+    for i in range(rows):
+        feedback = models.Feedback(
+            content="Overall a solid quarter with consistent delivery. " * 4,
+            strengths="Clear communication and thorough documentation. " * 4,
+            areas_to_improve="Share knowledge with junior team members more often. " * 4,
+            sentiment=list(models.FeedbackSentiment)[i % 3],
+            manager_id=manager.id,
+            employee_id=employee.id,
+        )
+        feedback.tags = [models.FeedbackTag(tag_name="communication"), models.FeedbackTag(tag_name="delivery")]
+        db.add(feedback)
+    db.commit()
+    return manager.id
+
+def orm_path(db, manager_id):
+    feedback = db.query(models.Feedback).options(selectinload(models.Feedback.tags), Load(models.Feedback).undefer_group("body")).filter(
+        models.Feedback.manager_id == manager_id
+    ).all()
+    validated = []
+    for item in feedback:
+        data = {field: getattr(item, field) for field in serialization.FEEDBACK_FIELDS}
+        data["tags"] = [tag.tag_name for tag in item.tags]
+        validated.append(schemas.Feedback(**data))
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def tuple_path(db, manager_id):
+    rows = db.query(*serialization.columns(models.Feedback, serialization.FEEDBACK_FIELDS)).filter(
+        models.Feedback.manager_id == manager_id
+    ).all()
+    return orjson.dumps(serialization.feedback_rows_to_dicts(db, rows))
+
+def bench(label, fn, session_factory, manager_id, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        db = session_factory()
+        started = time.perf_counter()
+        fn(db, manager_id)
+        timings.append(time.perf_counter() - started)
+        db.close()
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"{label:<30} {median * 1000:>10.2f} ms/page {median * 1e6 / rows:>10.1f} us/row")
+    return median
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        db = session_factory()
+        manager_id = seed(db, args.rows)
+        db.close()
+
+        # Both paths must produce the same payload before timing them
+        db = session_factory()
+        assert json.loads(orm_path(db, manager_id)) == json.loads(tuple_path(db, manager_id))
+        db.close()
+
+        before = bench("ORM + Pydantic + json", orm_path, session_factory, manager_id, args.rows, args.repeat)
+        after = bench("column tuples + orjson", tuple_path, session_factory, manager_id, args.rows, args.repeat)
+        print(f"speedup: {before / after:.1f}x")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
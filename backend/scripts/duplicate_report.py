@@ -0,0 +1,56 @@
+"""Report near-identical (copy-pasted) feedback, grouped by manager.
+
+Indexes any feedback that has no MinHash signature yet, then lists clusters
+of feedback by the same manager whose text is at least --threshold similar.
+Candidates come from the LSH bucket index, so the report does not compare
+every pair of feedback. In database-per-tenant mode every organization's
+database is searched.
+
+Usage:
+    python scripts/duplicate_report.py [--manager-id ID] [--threshold 0.8] [--csv]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import init_schema, maintenance_sessions
+from app import models  # noqa: F401  (registers the tables for init_schema)
+from app.utils.similarity import SIMILARITY_THRESHOLD, duplicate_clusters, index_missing
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manager-id", type=int, default=None, help="Only this manager's feedback")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--csv", action="store_true", help="Write one row per clustered feedback to stdout")
+    args = parser.parse_args()
+
+    init_schema()
+    clusters = []
+    for label, db in maintenance_sessions():
+        started = time.perf_counter()
+        indexed = index_missing(db)
+        if indexed:
+            print(f"Indexed {indexed} feedback row(s) of the {label} in {time.perf_counter() - started:.2f}s",
+                  file=sys.stderr)
+        clusters += duplicate_clusters(db, manager_id=args.manager_id, threshold=args.threshold)
+    clusters.sort(key=lambda cluster: (-len(cluster["feedback_ids"]), cluster["manager_id"]))
+    print(f"Found {len(clusters)} cluster(s)", file=sys.stderr)
+
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["cluster", "manager_id", "feedback_id", "min_similarity"])
+        for number, cluster in enumerate(clusters, start=1):
+            for feedback_id in cluster["feedback_ids"]:
+                writer.writerow([number, cluster["manager_id"], feedback_id, cluster["min_similarity"]])
+        return
+    for cluster in clusters:
+        ids = ", ".join(str(feedback_id) for feedback_id in cluster["feedback_ids"])
+        print(f"manager {cluster['manager_id']}: {len(cluster['feedback_ids'])} similar feedback "
+              f"(>= {cluster['min_similarity']:.2f}): {ids}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Grant or revoke admin access (request profiling reports) for a user.
+
+Admin rights are a flag on the user's row; they cannot be set through the
+API. Workers see the change within AUTH_USER_CACHE_SECONDS.
+
+Usage:
+    python scripts/grant_admin.py EMAIL [--revoke]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, init_schema
+from app import auth, models
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("email")
+    parser.add_argument("--revoke", action="store_true", help="Remove admin access instead")
+    args = parser.parse_args()
+
+    init_schema()
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == args.email).first()
+        if user is None:
+            sys.exit(f"No user with email {args.email}")
+        user.is_admin = not args.revoke
+        db.commit()
+        auth.forget_user(user.email)
+        print(f"{'Revoked' if args.revoke else 'Granted'} admin access for {user.email}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Import people and reporting lines from a CSV or NDJSON file.
+
+Each record has email, full_name, role, password and an optional
+manager_email; managers may come after their reports. Rejected rows are
+printed as NDJSON, followed by a summary. Valid rows are imported even when
+others are rejected, unless --dry-run is given.
+
+Usage:
+    python scripts/import_org.py FILE [--format csv|ndjson] [--organization-id ID]
+                                      [--dry-run] [--workers N] [--rounds N]
+"""
+import argparse
+import os
+import sys
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, init_schema
+from app import models, schemas
+from app.utils import org_import
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=[item.value for item in schemas.ImportFormat],
+                        help="Defaults to the file extension")
+    parser.add_argument("--organization-id", type=int)
+    parser.add_argument("--dry-run", action="store_true", help="Validate only")
+    parser.add_argument("--workers", type=int, default=org_import.IMPORT_HASH_WORKERS,
+                        help="Processes hashing passwords")
+    parser.add_argument("--rounds", type=int, default=org_import.IMPORT_BCRYPT_ROUNDS,
+                        help="bcrypt rounds for the initial passwords")
+    args = parser.parse_args()
+    format = schemas.ImportFormat(args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson"))
+
+    init_schema()
+    db = SessionLocal()
+    try:
+        if args.organization_id is not None and db.get(models.Organization, args.organization_id) is None:
+            sys.exit(f"No organization with id {args.organization_id}")
+        with open(args.file, encoding="utf-8-sig", newline="") as lines:
+            for entry in org_import.import_users(
+                db, org_import.parse_rows(lines, format), organization_id=args.organization_id,
+                dry_run=args.dry_run, workers=args.workers, rounds=args.rounds,
+            ):
+                print(orjson.dumps(entry).decode())
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
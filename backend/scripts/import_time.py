@@ -0,0 +1,95 @@
+"""Measure backend cold-start cost.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter, prints
+the slowest top-level imports and fails when the total exceeds the budget.
+It also times a fresh process from interpreter start to the first ``/ping``
+response, which is what an autoscaled container pays before serving traffic.
+
+Usage:
+    python scripts/import_time.py [--budget-ms 1500] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Total cumulative import time of `main` we are willing to pay on cold start
+IMPORT_BUDGET_MS = 1500
+
+FIRST_REQUEST_SNIPPET = """
+import asyncio
+import main
+
+async def first_request():
+    messages = []
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": "/ping", "raw_path": b"/ping",
+             "root_path": "", "query_string": b"", "headers": [], "client": ("127.0.0.1", 0),
+             "server": ("127.0.0.1", 8000)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await main.app(scope, receive, send)
+    assert messages[0]["status"] == 200, messages[0]
+
+asyncio.run(first_request())
+"""
+
+def parse_importtime(stderr):
+    """Return (module, self_us, cumulative_us, depth) rows from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def measure_imports():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        sys.exit(result.returncode)
+    return parse_importtime(result.stderr)
+
+def measure_first_request():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", FIRST_REQUEST_SNIPPET], cwd=BACKEND_DIR, check=True)
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure_imports()
+    total_ms = next(cumulative for name, _, cumulative, _ in rows if name == "main") / 1000
+    # Only the packages imported directly (depth 1) are actionable for us
+    top_level = sorted((row for row in rows if row[3] <= 1), key=lambda row: row[2], reverse=True)
+
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name, _, cumulative, _ in top_level[:args.top]:
+        print(f"{name:<40} {cumulative / 1000:>14.1f}")
+
+    first_request_ms = measure_first_request()
+    print(f"\nimport main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"process start to first /ping response: {first_request_ms:.1f} ms")
+
+    if total_ms > args.budget_ms:
+        print("Import-time budget exceeded")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Record response sizes for the main endpoints on a seeded dataset.
+
+Seeds a throwaway SQLite database with one manager, a team of employees and
+long-form feedback, then requests each endpoint uncompressed, gzip and brotli
+and prints the sizes. Exits non-zero when an uncompressed payload grows past
+its budget in PAYLOAD_BUDGETS, so accidental payload growth is caught.
+
+Requires httpx (for FastAPI's TestClient).
+
+Usage:
+    python scripts/payload_sizes.py [--employees 20] [--feedback-per-employee 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Uncompressed byte budgets for the default dataset (20 employees x 5 feedback)
+PAYLOAD_BUDGETS = {
+    "/api/feedback/": 200_000,
+    "/api/feedback/?view=summary": 60_000,
+    "/api/dashboard/manager": 12_000,
+    "/api/notifications/": 8_000,
+    "/api/users/": 4_000,
+}
+
+def seed(session_factory, models, auth, employees, feedback_per_employee):
+    db = session_factory()
+    password = auth.get_password_hash("password")
+    manager = models.User(email="manager@example.com", full_name="Manager", hashed_password=password,
+                          role=models.UserRole.MANAGER, is_active=True)
+    db.add(manager)
+    db.commit()
+    team = [
+        models.User(email=f"employee{i}@example.com", full_name=f"Employee {i}", hashed_password=password,
+                    role=models.UserRole.EMPLOYEE, manager_id=manager.id, is_active=True)
+        for i in range(employees)
+    ]
+    db.add_all(team)
+    db.commit()
+    for employee in team:
+        for i in range(feedback_per_employee):
+            db.add(models.Feedback(
+                content="Consistently delivers well-scoped changes and keeps the team informed. " * 5,
+                strengths="Clear written communication, careful reviews and reliable estimates. " * 5,
+                areas_to_improve="Could delegate more and share context earlier in the planning cycle. " * 5,
+                sentiment=list(models.FeedbackSentiment)[i % 3],
+                manager_id=manager.id,
+                employee_id=employee.id,
+            ))
+        db.add(models.Notification(user_id=manager.id, message=f"{employee.full_name} has requested feedback"))
+    db.commit()
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--feedback-per-employee", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'payload.db')}"
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app import models, auth
+    from app.database import SessionLocal
+    from app.utils import compression
+
+    seed(SessionLocal, models, auth, args.employees, args.feedback_per_employee)
+
+    client = TestClient(app_main.app)
+    token = client.post("/token", data={"username": "manager@example.com", "password": "password"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    print(f"{'endpoint':<32}" + "".join(f"{encoding:>12}" for encoding in encodings))
+
+    over_budget = []
+    for path, budget in PAYLOAD_BUDGETS.items():
+        sizes = []
+        for encoding in encodings:
+            # Read the raw wire bytes so compressed sizes are not hidden by automatic decoding
+            with client.stream("GET", path, headers={**headers, "Accept-Encoding": encoding}) as response:
+                response.raise_for_status()
+                sizes.append(sum(len(chunk) for chunk in response.iter_raw()))
+        print(f"{path:<32}" + "".join(f"{size:>12}" for size in sizes))
+        if sizes[0] > budget:
+            over_budget.append(f"{path}: {sizes[0]} bytes > budget {budget}")
+
+    if over_budget:
+        print("\nPayload budget exceeded:\n  " + "\n  ".join(over_budget))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Log a user out everywhere, optionally deactivating the account.
+
+Revokes every access and refresh token issued to the user so far. Workers
+pick the revocation up within REVOCATION_SYNC_SECONDS.
+
+Usage:
+    python scripts/revoke_tokens.py EMAIL [--deactivate]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, init_schema
+from app import auth, models
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("email")
+    parser.add_argument("--deactivate", action="store_true", help="Also set is_active to false")
+    args = parser.parse_args()
+
+    init_schema()
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == args.email).first()
+        if user is None:
+            sys.exit(f"No user with email {args.email}")
+        if args.deactivate:
+            user.is_active = False
+            db.commit()
+        auth.revoke_user_tokens(db, user)
+        print(f"Revoked all tokens of {user.email}" + (" and deactivated the account" if args.deactivate else ""))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Send reminder notifications for stale feedback requests and unacknowledged feedback.
+
+Run once from cron, or keep it running with --every to act as a small
+scheduler. Run a single instance per deployment; per-user throttling keeps
+overlapping runs from sending duplicates in the common case. In
+database-per-tenant mode every organization's database is covered.
+
+Usage:
+    python scripts/send_reminders.py [--chunk-size 1000] [--pause 0.05] [--every SECONDS]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import init_schema, maintenance_sessions
+from app import models  # noqa: F401  (registers the tables for init_schema)
+from app.utils.reminders import REMINDER_CHUNK_SIZE, send_reminders
+
+def run_once(chunk_size, pause):
+    started = time.perf_counter()
+    sent = 0
+    for _, db in maintenance_sessions():
+        sent += sum(send_reminders(db, chunk_size=chunk_size, pause_seconds=pause).values())
+    print(f"Sent {sent} reminder(s) in {time.perf_counter() - started:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=REMINDER_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks")
+    parser.add_argument("--every", type=float, default=None, help="Repeat every N seconds instead of exiting")
+    args = parser.parse_args()
+
+    init_schema()
+    while True:
+        run_once(args.chunk_size, args.pause)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
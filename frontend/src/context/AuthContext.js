@@ -55,6 +55,7 @@ export const AuthProvider = ({ children }) => {
         
         // Save the token
         localStorage.setItem('token', data.access_token);
+        localStorage.setItem('refreshToken', data.refresh_token);
         api.setToken(data.access_token);
         
         try {
@@ -112,7 +113,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    if (localStorage.getItem('token')) {
+      api.logout();
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     api.setToken(null);
     setUser(null);
     setIsAuthenticated(false);
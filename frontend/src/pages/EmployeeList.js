@@ -37,6 +37,9 @@ const EmployeeList = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [newMember, setNewMember] = useState({ full_name: '', email: '', password: '' });
+  const [adding, setAdding] = useState(false);
+  const [addError, setAddError] = useState(null);
   
   useEffect(() => {
     const fetchEmployees = async () => {
@@ -64,6 +67,22 @@ const EmployeeList = () => {
     navigate(`/feedback/create/${employeeId}`);
   };
   
+  // New members join this manager's team and organization
+  const handleAddMember = async (e) => {
+    e.preventDefault();
+    setAdding(true);
+    setAddError(null);
+    try {
+      const member = await api.addTeamMember({ ...newMember, role: 'employee' });
+      setEmployees(prev => [...prev, member]);
+      setNewMember({ full_name: '', email: '', password: '' });
+    } catch (err) {
+      setAddError(err.message || 'Failed to add team member');
+    } finally {
+      setAdding(false);
+    }
+  };
+  
   if (loading) {
     return (
       <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '70vh' }}>
@@ -86,6 +105,45 @@ const EmployeeList = () => {
         Team Members
       </Typography>
       
+      <Paper variant="outlined" sx={{ p: 2, mb: 3 }}>
+        <Typography variant="h6" gutterBottom>
+          Add a team member
+        </Typography>
+        {addError && (
+          <Alert severity="error" sx={{ mb: 2 }}>
+            {addError}
+          </Alert>
+        )}
+        <Box component="form" onSubmit={handleAddMember} sx={{ display: 'flex', gap: 2, flexWrap: 'wrap' }}>
+          <TextField
+            required
+            size="small"
+            label="Full Name"
+            value={newMember.full_name}
+            onChange={(e) => setNewMember(prev => ({ ...prev, full_name: e.target.value }))}
+          />
+          <TextField
+            required
+            size="small"
+            label="Email Address"
+            type="email"
+            value={newMember.email}
+            onChange={(e) => setNewMember(prev => ({ ...prev, email: e.target.value }))}
+          />
+          <TextField
+            required
+            size="small"
+            label="Initial Password"
+            type="password"
+            value={newMember.password}
+            onChange={(e) => setNewMember(prev => ({ ...prev, password: e.target.value }))}
+          />
+          <Button type="submit" variant="contained" disabled={adding}>
+            {adding ? 'Adding...' : 'Add'}
+          </Button>
+        </Box>
+      </Paper>
+      
       <Box sx={{ mb: 3 }}>
         <TextField
           fullWidth
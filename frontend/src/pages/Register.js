@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { Link as RouterLink, useNavigate } from 'react-router-dom';
 import {
   Container,
@@ -10,16 +10,10 @@ import {
   Paper,
   Grid,
   Alert,
-  Avatar,
-  FormControl,
-  InputLabel,
-  Select,
-  MenuItem,
-  CircularProgress
+  Avatar
 } from '@mui/material';
 import PersonAddIcon from '@mui/icons-material/PersonAdd';
 import { useAuth } from '../context/AuthContext';
-import api from '../services/api';
 
 const Register = () => {
   const { register } = useAuth();
@@ -29,34 +23,11 @@ const Register = () => {
     full_name: '',
     email: '',
     password: '',
-    confirmPassword: '',
-    role: 'employee',
-    manager_id: ''
+    confirmPassword: ''
   });
   
-  const [managers, setManagers] = useState([]);
-  const [loadingManagers, setLoadingManagers] = useState(false);
   const [error, setError] = useState(null);
   const [loading, setLoading] = useState(false);
-    // Fetch managers when the component loads
-  useEffect(() => {
-    const fetchManagers = async () => {
-      if (formData.role === 'employee') {
-        setLoadingManagers(true);
-        try {
-          const data = await api.getManagers();
-          setManagers(data);
-        } catch (err) {
-          console.error('Failed to fetch managers:', err);
-        } finally {
-          setLoadingManagers(false);
-        }
-      }
-    };
-    
-    fetchManagers();
-  }, [formData.role]);
-  
   const handleChange = (e) => {
     const { name, value } = e.target;
     setFormData(prev => ({
@@ -78,29 +49,18 @@ const Register = () => {
       return;
     }
     
-    // Validate manager selection for employees
-    if (formData.role === 'employee' && !formData.manager_id && managers.length > 0) {
-      setError('Please select a manager');
-      return;
-    }
-    
     setLoading(true);
     setError(null);
     
     try {
-      // Register user with appropriate data
+      // Signing up starts a new organization with this account as its manager
       const userData = {
         full_name: formData.full_name,
         email: formData.email,
         password: formData.password,
-        role: formData.role
+        role: 'manager'
       };
       
-      // Only add manager_id for employees
-      if (formData.role === 'employee' && formData.manager_id) {
-        userData.manager_id = formData.manager_id;
-      }
-      
       await register(userData);
       
       // Redirect to login
@@ -134,6 +94,9 @@ const Register = () => {
             <Typography component="h2" variant="h6">
               Create an Account
             </Typography>
+            <Typography variant="body2" color="text.secondary" align="center">
+              Start a new organization as its manager. Employees are added by their manager.
+            </Typography>
             
             {error && (
               <Alert severity="error" sx={{ mt: 2, width: '100%' }}>
@@ -187,47 +150,7 @@ const Register = () => {
                 id="confirm-password"
                 value={formData.confirmPassword}
                 onChange={handleChange}
-              />              <FormControl fullWidth margin="normal">
-                <InputLabel id="role-label">Role</InputLabel>
-                <Select
-                  labelId="role-label"
-                  id="role"
-                  value={formData.role}
-                  label="Role"
-                  name="role"
-                  onChange={handleChange}
-                >
-                  <MenuItem value="employee">Employee</MenuItem>
-                  <MenuItem value="manager">Manager</MenuItem>
-                </Select>
-              </FormControl>
-              
-              {formData.role === 'employee' && (
-                <FormControl fullWidth margin="normal">
-                  <InputLabel id="manager-label">Select Your Manager</InputLabel>
-                  <Select
-                    labelId="manager-label"
-                    id="manager_id"
-                    value={formData.manager_id}
-                    label="Select Your Manager"
-                    name="manager_id"
-                    onChange={handleChange}
-                    disabled={loadingManagers}
-                  >
-                    {loadingManagers ? (
-                      <MenuItem value="">
-                        <CircularProgress size={24} />
-                      </MenuItem>
-                    ) : (
-                      managers.map(manager => (
-                        <MenuItem key={manager.id} value={manager.id}>
-                          {manager.full_name} ({manager.email})
-                        </MenuItem>
-                      ))
-                    )}
-                  </Select>
-                </FormControl>
-              )}
+              />
               
               <Button
                 type="submit"
@@ -14,6 +14,70 @@ const initializeToken = () => {
 // Run the initialization
 initializeToken();
 
+// Echo the time of our last write so the API keeps our reads on the primary database
+// for a few seconds and skips cached results older than it, whichever server handles them
+axios.interceptors.response.use((response) => {
+  const lastWrite = response.headers['x-last-write'];
+  if (lastWrite) {
+    axios.defaults.headers.common['X-Last-Write'] = lastWrite;
+  }
+  return response;
+});
+
+// Access tokens are short-lived: on a 401, renew with the refresh token and retry once.
+// Refresh tokens are single-use, so concurrent 401s share one refresh request.
+let refreshing = null;
+
+const refreshAccessToken = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refreshToken');
+    refreshing = axios.post(`${API_URL}/token/refresh`, { refresh_token: refreshToken })
+      .then(({ data }) => {
+        localStorage.setItem('token', data.access_token);
+        localStorage.setItem('refreshToken', data.refresh_token);
+        axios.defaults.headers.common['Authorization'] = `Bearer ${data.access_token}`;
+        return data.access_token;
+      })
+      .catch((refreshError) => {
+        console.error('Token refresh failed:', refreshError);
+        // Keep a refresh token that another tab has already replaced
+        if (localStorage.getItem('refreshToken') === refreshToken) {
+          localStorage.removeItem('refreshToken');
+        }
+        throw refreshError;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+axios.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    if (error.response && error.response.status === 401 && localStorage.getItem('refreshToken') && original &&
+        !original._retried && !original.url.includes('/token')) {
+      original._retried = true;
+      const current = axios.defaults.headers.common['Authorization'];
+      if (current && original.headers['Authorization'] !== current) {
+        // Sent with a token that has been renewed since; retry with the new one
+        original.headers['Authorization'] = current;
+        return axios(original);
+      }
+      try {
+        const accessToken = await refreshAccessToken();
+        original.headers['Authorization'] = `Bearer ${accessToken}`;
+        return axios(original);
+      } catch (refreshError) {
+        // Fall through to the original 401
+      }
+    }
+    return Promise.reject(error);
+  }
+);
+
 const api = {
   // Token management
   setToken: (token) => {
@@ -44,6 +108,18 @@ const api = {
       throw handleError(error);
     }
   },
+  // Revoke the current access token and the stored refresh token
+  logout: async () => {
+    try {
+      await axios.post(
+        `${API_URL}/token/revoke`,
+        { refresh_token: localStorage.getItem('refreshToken') },
+        { headers: { Authorization: `Bearer ${localStorage.getItem('token')}` } }
+      );
+    } catch (error) {
+      console.error('Logout error:', error.response ? error.response.data : error.message);
+    }
+  },
   // Generic API methods
   get: async (endpoint) => {
     try {
@@ -169,9 +245,23 @@ const api = {
   updateFeedback: (id, feedbackData) => api.put(`/api/feedback/${id}`, feedbackData),
   acknowledgeFeedback: (id) => api.put(`/api/feedback/${id}/acknowledge`, {}),
   commentOnFeedback: (id, comment) => api.post(`/api/feedback/${id}/comments/`, { comment }),
+  // Pass next_after from the previous page as `after` while has_more
+  getFeedbackComments: (id, after = null) =>
+    api.get(`/api/feedback/${id}/comments/${after !== null ? `?after=${after}` : ''}`),
+  getFeedbackBatch: (ids) => api.get(`/api/feedback/batch?ids=${ids.join(',')}`),
+  getUsersBatch: (ids) => api.get(`/api/users/batch?ids=${ids.join(',')}`),
+  suggestSentiment: (draft) => api.post('/api/feedback/sentiment-suggestion', draft),
+  exportFeedback: () => api.get('/api/feedback/export', { responseType: 'blob' }),
     // Manager specific methods
   getEmployees: () => api.get('/api/users/'),
+  addTeamMember: (member) => api.post('/api/users/reports/', member),
   getManagers: () => api.get('/api/managers/'),
+  // CSV or NDJSON file; resolves to the NDJSON report (rejected rows, then a summary)
+  importUsers: (file, dryRun = false) => axios.post(
+    `${API_URL}/api/users/import?dry_run=${dryRun}`, file,
+    { headers: { 'Content-Type': file.type || 'text/csv' }, responseType: 'text' }
+  ).then(({ data }) => data.trim().split('\n').map((line) => JSON.parse(line)))
+    .catch((error) => { throw handleError(error); }),
     // Dashboard methods
   getManagerDashboard: async () => {
     try {
@@ -229,9 +319,13 @@ function handleError(error) {
       message = 'Authentication failed. Please sign in again.';
       // Clear token to force re-login
       localStorage.removeItem('token');
+      localStorage.removeItem('refreshToken');
       delete axios.defaults.headers.common['Authorization'];
     } else if (error.response.status === 403) {
       message = 'You do not have permission to perform this action.';
+    } else if (error.response.status === 429 || error.response.status === 503) {
+      const retryAfter = error.response.headers['retry-after'];
+      message = `The server is busy. Please try again${retryAfter ? ` in ${retryAfter} seconds` : ' shortly'}.`;
     } else if (error.response.data) {
       if (error.response.data.detail) {
         // Handle FastAPI validation errors which come as an array